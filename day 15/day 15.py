@@ -1,81 +1,13 @@
-import time
-from multiprocessing import Process, Pipe
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from intcode import IntcodeComputer, Connection
+from terminal import Renderer
 from collections import deque
+import heapq
 
 #
 # Classes
 #
-class IntcodeComputer:
-    """This is a version of the Intcode computer that expects to be run in a separate process, and communicate using a Pipe"""
-    def __init__(self, program_string: str) -> None:
-        self.program = list(map(int, program_string.split(',')))
-
-    def expand_memory(self, size: int) -> None:
-        self.program.extend([0] * size)
-
-    def fetch(self, pos: int, param_mode: int, rel_base: int) -> int:
-        """Fetches a value from the program at position 'pos' using parameter mode 'mode'"""
-        match param_mode:
-            case 0: return self.program[self.program[pos]]              # Position mode
-            case 1: return self.program[pos]                            # Absolute mode
-            case 2: return self.program[rel_base + self.program[pos]]   # Relative mode
-
-    def stor(self, pos: int, param_mode: int, rel_base: int, val: int) -> None:
-        """Stores a value in the program at position 'pos' using parameter mode 'mode'"""
-        match param_mode:
-            case 0: self.program[self.program[pos]] = val               # Position mode
-            case 1: self.program[pos] = val                             # Absolute mode
-            case 2: self.program[rel_base + self.program[pos]] = val    # Relative mode
-
-    def execute(self, conn: Pipe) -> None:
-        """Executes the program, with communication with host process happening through Pipe object"""
-        instr_ptr = 0
-        rel_base = 0
-
-        while True:
-            op_code = self.program[instr_ptr] % 100
-            param_mode = self.program[instr_ptr] // 100
-
-            match op_code:
-                case 1:     # Addition
-                    self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, self.fetch(instr_ptr + 1, param_mode % 10, rel_base) + self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base))
-                    instr_ptr += 4
-                case 2:     # Multiplication
-                    self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, self.fetch(instr_ptr + 1, param_mode % 10, rel_base) * self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base))
-                    instr_ptr += 4
-                case 3:     # Input data
-                    self.stor(instr_ptr + 1, param_mode % 10, rel_base, conn.recv())
-                    instr_ptr += 2
-                case 4:     # Output data
-                    conn.send(self.fetch(instr_ptr + 1, param_mode % 10, rel_base))
-                    instr_ptr += 2
-                case 5:     # Jump if true
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) != 0: instr_ptr = self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base)
-                    else: instr_ptr += 3
-                case 6:     # Jump if false
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) == 0: instr_ptr = self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base)
-                    else: instr_ptr += 3
-                case 7:     # Less than
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) < self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base):
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 1)
-                    else:
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 0)
-                    instr_ptr += 4
-                case 8:     # Equals
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) == self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base):
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 1)
-                    else:
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 0)
-                    instr_ptr += 4
-                case 9:     # Change relative base
-                    rel_base += self.fetch(instr_ptr + 1, param_mode % 10, rel_base)
-                    instr_ptr += 2
-                case 99:    # Break
-                    return
-                case _:
-                    print(f'Error: Unknown opcode {op_code}... aborting.')
-                    return
-
 class TileType:
     """Lists the available tile types in the section map"""
     WALL = 0
@@ -84,9 +16,85 @@ class TileType:
     TO_EXPLORE = 3
     ORIGIN = 4
 
-class SectionMap:
-    """Contains all information about known whereabouts of different tile types"""
+class FrontierField:
+    """Lower bounds on the distance from every known open tile to the nearest tile left to explore, which guide an A*
+    search for the nearest tile to explore straight to it instead of searching the whole map.
+
+    New tiles to explore lower the bounds around them right away, as a BFS that stops where the bounds are already low
+    enough. Tiles that get explored or turn out to be walls leave bounds behind that are too low. Those are only
+    raised when a search runs into them: every tile a search expands learns its distance from the result (Adaptive
+    A*). The bounds stay consistent throughout, so the search always finds a nearest tile"""
     def __init__(self) -> None:
+        self.bound = {}         # Lower bound on the distance to the nearest tile to explore, for every open tile
+        self.open = set()       # Floor tiles and tiles to explore
+        self.sources = set()    # Tiles to explore
+
+    @staticmethod
+    def neighbors(pos: complex) -> tuple:
+        return (pos+1, pos-1, pos+1j, pos-1j)
+
+    def add_floor(self, pos: complex) -> None:
+        """Add an explored open tile"""
+        self.open.add(pos)
+        self.sources.discard(pos)
+        if pos not in self.bound: self.bound[pos] = 0
+
+    def add_sources(self, tiles: set) -> None:
+        """Add tiles to explore, and lower the bounds around them"""
+        queue = deque(tiles)
+        for pos in tiles:
+            self.open.add(pos)
+            self.sources.add(pos)
+            self.bound[pos] = 0
+        while len(queue) > 0:
+            pos = queue.popleft()
+            for nb in self.neighbors(pos):
+                if nb in self.open and self.bound[nb] > self.bound[pos] + 1:
+                    self.bound[nb] = self.bound[pos] + 1
+                    queue.append(nb)
+
+    def remove(self, pos: complex) -> None:
+        """Remove a tile that turned out to be a wall"""
+        self.open.discard(pos)
+        self.sources.discard(pos)
+        self.bound.pop(pos, None)
+
+    def path_to_nearest(self, pos: complex) -> list | None:
+        """Steps from 'pos' to the nearest tile to explore, or None if none can be reached"""
+        # A* search over open tiles, preferring deeper tiles between equally promising ones
+        dist = { pos: 0 }
+        parents = { pos: None }
+        heap = [ (self.bound[pos], 0, pos.real, pos.imag) ]
+        expanded = []
+        while len(heap) > 0:
+            _, neg_dist, x, y = heapq.heappop(heap)
+            current_pos = complex(x, y)
+            if -neg_dist > dist[current_pos]: continue
+            if current_pos in self.sources: break
+            expanded.append(current_pos)
+            for nb in self.neighbors(current_pos):
+                if nb in self.open and dist[current_pos] + 1 < dist.get(nb, dist[current_pos] + 2):
+                    dist[nb] = dist[current_pos] + 1
+                    parents[nb] = current_pos
+                    heapq.heappush(heap, (dist[nb] + self.bound[nb], -dist[nb], nb.real, nb.imag))
+        else: return None
+
+        # Every tile expanded is at least as far from a tile to explore as it is from the one found
+        for tile in expanded: self.bound[tile] = max(self.bound[tile], dist[current_pos] - dist[tile])
+
+        steps = []
+        while parents[current_pos] is not None:
+            steps.append(current_pos - parents[current_pos])
+            current_pos = parents[current_pos]
+        return steps[::-1]
+
+class SectionMap:
+    """Contains all information about known whereabouts of different tile types. Tiles are drawn as they are
+    updated when a renderer is given"""
+    def __init__(self, renderer: Renderer | None = None) -> None:
+        self.renderer = renderer
+        self.droid_position = None
+        self.frontier = FrontierField()
         self.tiles = {
             TileType.WALL: set(),
             TileType.FLOOR: set(),
@@ -97,58 +105,66 @@ class SectionMap:
         self.update_tile(0+0j, TileType.FLOOR)
 
     def draw(self, droid_position: complex = None) -> None:
-        """Draw the map by printing to STDOUT"""
-        rows = [ int(x.imag) for x in (self.tiles[TileType.FLOOR] | self.tiles[TileType.WALL] | self.tiles[TileType.TO_EXPLORE]) ]
-        cols = [ int(x.real) for x in (self.tiles[TileType.FLOOR] | self.tiles[TileType.WALL] | self.tiles[TileType.TO_EXPLORE]) ]
-        set_string = f'\033[2J'
-        for y in range(min(rows), max(rows)+1):
-            for x in range(min(cols), max(cols)+1):
-                tile = x+y*1j
-                if tile == droid_position: set_string += chr(0x25aa)
-                elif tile in self.tiles[TileType.OXYGEN_SYSTEM]: set_string += 'O'
-                elif tile in self.tiles[TileType.FLOOR]: set_string += chr(0x2591)
-                elif tile in self.tiles[TileType.WALL]: set_string += chr(0x2588)
-                elif tile in self.tiles[TileType.TO_EXPLORE]: set_string += '?'
-                else: set_string += ' '
-            set_string += '\n'
-        print(set_string)
+        """Show the droid at its position, and draw a frame if it is time for one"""
+        if self.renderer is None: return
+        if self.droid_position is not None: self.draw_tile(self.droid_position)
+        self.droid_position = droid_position
+        if droid_position is not None: self.renderer[droid_position] = chr(0x25aa)
+        self.renderer.frame()
+
+    def draw_tile(self, tile: complex) -> None:
+        """Update the tile in the renderer"""
+        if self.renderer is None: return
+        if tile == self.droid_position: self.renderer[tile] = chr(0x25aa)
+        elif tile in self.tiles[TileType.OXYGEN_SYSTEM]: self.renderer[tile] = 'O'
+        elif tile in self.tiles[TileType.FLOOR]: self.renderer[tile] = chr(0x2591)
+        elif tile in self.tiles[TileType.WALL]: self.renderer[tile] = chr(0x2588)
+        elif tile in self.tiles[TileType.TO_EXPLORE]: self.renderer[tile] = '?'
 
     def update_tile(self, pos: complex, tile_type: TileType) -> None:
         """Update information about what is known about a given tile"""
-        if pos in self.tiles[TileType.TO_EXPLORE]: self.tiles[TileType.TO_EXPLORE].remove(pos)
-        add_to_explore = {pos+1, pos-1, pos+1j, pos-1j} - (self.tiles[TileType.FLOOR] | self.tiles[TileType.WALL])
+        self.tiles[TileType.TO_EXPLORE].discard(pos)
+        add_to_explore = { nb for nb in (pos+1, pos-1, pos+1j, pos-1j)
+                           if nb not in self.tiles[TileType.FLOOR] and nb not in self.tiles[TileType.WALL]
+                           and nb not in self.tiles[TileType.TO_EXPLORE] }
         match tile_type:
-            case TileType.WALL: self.tiles[TileType.WALL].add(pos)
-            case TileType.FLOOR:
-                self.tiles[TileType.FLOOR].add(pos)
-                self.tiles[TileType.TO_EXPLORE] |= add_to_explore
-            case TileType.OXYGEN_SYSTEM:
-                self.tiles[TileType.OXYGEN_SYSTEM].add(pos)
+            case TileType.WALL:
+                self.tiles[TileType.WALL].add(pos)
+                self.frontier.remove(pos)
+                add_to_explore = set()
+            case TileType.FLOOR | TileType.OXYGEN_SYSTEM:
+                if tile_type == TileType.OXYGEN_SYSTEM: self.tiles[TileType.OXYGEN_SYSTEM].add(pos)
                 self.tiles[TileType.FLOOR].add(pos)
                 self.tiles[TileType.TO_EXPLORE] |= add_to_explore
+                self.frontier.add_sources(add_to_explore)
+                self.frontier.add_floor(pos)
+        for tile in add_to_explore | {pos}: self.draw_tile(tile)
 
     def get_path_to_tile_type(self, pos: complex, tile_type: TileType) -> list:
-        """Find the shortest path to a tile of a given tile type"""
+        """Find the shortest path over known floor to a tile of a given tile type, as a list of steps"""
         if len(self.tiles[tile_type]) == 0: return None     # If there are no such tiles to be found, leave the function
+        if tile_type == TileType.TO_EXPLORE: return self.frontier.path_to_nearest(pos)
 
-        queue = deque([ (pos, deque()) ])
-        explored = set()
+        # Breadth first search that remembers where every tile was reached from, instead of copying paths around
+        parents = { pos: None }
+        queue = deque([ pos ])
         while len(queue) > 0:
-            current_pos, current_path = queue.popleft()
-            if current_pos in explored: continue
-            explored.add(current_pos)
-            current_path.append(current_pos)
+            current_pos = queue.popleft()
             if current_pos in self.tiles[tile_type]: break  # End the search when the requested tile type has been found
-            to_explore = list({current_pos+1, current_pos-1, current_pos+1j, current_pos-1j} - self.tiles[TileType.WALL])
-            for next_pos in to_explore: queue.append((next_pos, current_path.copy()))
+            if current_pos not in self.tiles[TileType.FLOOR]: continue
+            for next_pos in (current_pos+1, current_pos-1, current_pos+1j, current_pos-1j):
+                if next_pos not in parents and next_pos not in self.tiles[TileType.WALL]:
+                    parents[next_pos] = current_pos
+                    queue.append(next_pos)
+        else: return None
 
         # Assemble a list of steps needed to take to arrive at the given tile type
         assembled_directions = []
-        for i in range(len(current_path)-1):
-            assembled_directions.append(current_path[i+1] - current_path[i])
+        while parents[current_pos] is not None:
+            assembled_directions.append(current_pos - parents[current_pos])
+            current_pos = parents[current_pos]
+        return assembled_directions[::-1]
 
-        return assembled_directions
-    
     def get_steps_to_fill_map(self) -> int:
         queue = deque([(self.tiles[TileType.OXYGEN_SYSTEM].pop(), 0)])
         explored = set()
@@ -162,17 +178,6 @@ class SectionMap:
 
         return last_steps
 
-#
-# Worker processes
-#
-def computer_main(conn):
-    """Main function for the process running the computer. Communicating with other processes using a Pipe object"""
-    with open('day 15/input.txt') as file:
-        program_string = file.read().strip()
-    computer = IntcodeComputer(program_string)
-    computer.execute(conn)
-    conn.close()
-
 #
 # Translation dictionaries
 #
@@ -184,20 +189,30 @@ TO_COMPUTER = {
 }
 
 #
-# Main function
+# Functions
 #
-if __name__ == "__main__":
-    conn, child_conn = Pipe()
-    p = Process(target=computer_main, args=(child_conn,))
-    p.start()
-
-    section_map = SectionMap()
+def explore(computer: IntcodeComputer, section_map: SectionMap) -> None:
+    """Map the whole section in one breadth first sweep. The droid is forked at every open tile, and every unexplored
+    neighbour is tried by a fork of its own, so the droid never has to walk back to the tiles left to explore"""
+    queue = deque([ (0+0j, computer) ])
+    while len(queue) > 0:
+        pos, droid = queue.popleft()
+        for movement_cmd, direction in TO_COMPUTER.items():
+            next_pos = pos + movement_cmd
+            if next_pos in section_map.tiles[TileType.FLOOR] or next_pos in section_map.tiles[TileType.WALL]: continue
+            child = droid.fork()
+            droid_response = child.run([direction])[0]
+            section_map.update_tile(next_pos, droid_response)
+            if droid_response != TileType.WALL: queue.append((next_pos, child))
+        section_map.draw(pos)
+
+def walk(conn: Connection, section_map: SectionMap) -> None:
+    """Map the whole section by walking the droid to the nearest unexplored tile, over and over"""
     current_position = 0+0j
     walk_queue = []
 
-    step_counter = 0
     while True:
-        if step_counter % 25 == 0: section_map.draw(current_position)
+        section_map.draw(current_position)
         if len(walk_queue) == 0: walk_queue = section_map.get_path_to_tile_type(current_position, TileType.TO_EXPLORE)
         if walk_queue == None: break
         movement_cmd = walk_queue.pop(0)
@@ -212,14 +227,22 @@ if __name__ == "__main__":
                 current_position += movement_cmd
                 section_map.update_tile(current_position, droid_response)
 
-        step_counter += 1
-        time.sleep(0.001)
-    # Terminate instead of join since the program runs a never ending loop
-    p.terminate()
-    # p.join()
+#
+# Main function
+#
+if __name__ == "__main__":
+    with open('day 15/input.txt') as file:
+        computer = IntcodeComputer(file.read().strip())
+
+    renderer = Renderer()
+    section_map = SectionMap(renderer)
+
+    # Usage: day 15.py [walk], where walk explores by walking the droid around instead of forking it
+    if len(sys.argv) > 1 and sys.argv[1] == 'walk': walk(Connection(computer), section_map)
+    else: explore(computer, section_map)
 
     section_map.draw(0+0j)
+    renderer.close()
     print(f'Puzzle 1 solution is: {len(section_map.get_path_to_tile_type(0+0j, TileType.OXYGEN_SYSTEM))}')
 
     print(f'Puzzle 2 solution is: {section_map.get_steps_to_fill_map()}')
-
@@ -1,80 +1,11 @@
-from multiprocessing import Process, Pipe
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from intcode import IntcodeComputer, Connection
 from collections import deque
 
 #
 # Classes
 #
-class IntcodeComputer:
-    """This is a version of the Intcode computer that expects to be run in a separate process, and communicate using a Pipe"""
-    def __init__(self, program_string: str) -> None:
-        self.program = list(map(int, program_string.split(',')))
-
-    def expand_memory(self, size: int) -> None:
-        self.program.extend([0] * size)
-
-    def fetch(self, pos: int, param_mode: int, rel_base: int) -> int:
-        """Fetches a value from the program at position 'pos' using parameter mode 'mode'"""
-        match param_mode:
-            case 0: return self.program[self.program[pos]]              # Position mode
-            case 1: return self.program[pos]                            # Absolute mode
-            case 2: return self.program[rel_base + self.program[pos]]   # Relative mode
-
-    def stor(self, pos: int, param_mode: int, rel_base: int, val: int) -> None:
-        """Stores a value in the program at position 'pos' using parameter mode 'mode'"""
-        match param_mode:
-            case 0: self.program[self.program[pos]] = val               # Position mode
-            case 1: self.program[pos] = val                             # Absolute mode
-            case 2: self.program[rel_base + self.program[pos]] = val    # Relative mode
-
-    def execute(self, conn: Pipe) -> None:
-        """Executes the program, with communication with host process happening through Pipe object"""
-        instr_ptr = 0
-        rel_base = 0
-
-        while True:
-            op_code = self.program[instr_ptr] % 100
-            param_mode = self.program[instr_ptr] // 100
-
-            match op_code:
-                case 1:     # Addition
-                    self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, self.fetch(instr_ptr + 1, param_mode % 10, rel_base) + self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base))
-                    instr_ptr += 4
-                case 2:     # Multiplication
-                    self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, self.fetch(instr_ptr + 1, param_mode % 10, rel_base) * self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base))
-                    instr_ptr += 4
-                case 3:     # Input data
-                    self.stor(instr_ptr + 1, param_mode % 10, rel_base, conn.recv())
-                    instr_ptr += 2
-                case 4:     # Output data
-                    conn.send(self.fetch(instr_ptr + 1, param_mode % 10, rel_base))
-                    instr_ptr += 2
-                case 5:     # Jump if true
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) != 0: instr_ptr = self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base)
-                    else: instr_ptr += 3
-                case 6:     # Jump if false
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) == 0: instr_ptr = self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base)
-                    else: instr_ptr += 3
-                case 7:     # Less than
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) < self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base):
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 1)
-                    else:
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 0)
-                    instr_ptr += 4
-                case 8:     # Equals
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) == self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base):
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 1)
-                    else:
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 0)
-                    instr_ptr += 4
-                case 9:     # Change relative base
-                    rel_base += self.fetch(instr_ptr + 1, param_mode % 10, rel_base)
-                    instr_ptr += 2
-                case 99:    # Break
-                    return
-                case _:
-                    print(f'Error: Unknown opcode {op_code}... aborting.')
-                    return
-
 class TileType:
     """Lists the available tile types in the scaffold map"""
     SCAFFOLD = '#'
@@ -139,27 +70,6 @@ class ScaffoldMap:
         return journey
 
 
-#
-# Worker processes
-#
-def computer_main(conn):
-    """Main function for the process running the computer. Communicating with other processes using a Pipe object"""
-    with open('day 17/input.txt') as file:
-        program_string = file.read().strip()
-    computer = IntcodeComputer(program_string)
-    computer.expand_memory(10000)
-    computer.execute(conn)
-    conn.close()
-
-def modified_computer_main(conn):
-    with open('day 17/input.txt') as file:
-        program_string = file.read().strip()
-    computer = IntcodeComputer(program_string)
-    computer.program[0] = 2 # Alter the program to accept commands
-    computer.expand_memory(10000)
-    computer.execute(conn)
-    conn.close()
-
 #
 # Translation dictionaries
 #
@@ -171,7 +81,7 @@ TURN_COMMAND = {
 #
 # Helper function
 #
-def get_camera_frame(conn: Pipe) -> str:
+def get_camera_frame(conn: Connection) -> str:
     frame = ''
     ret_val = None
     while frame[-2:] != '\n\n':
@@ -189,9 +99,9 @@ if __name__ == "__main__":
     #
     # Puzzle 1
     #
-    conn, child_conn = Pipe()
-    p = Process(target=computer_main, args=(child_conn,))
-    p.start()
+    with open('day 17/input.txt') as file:
+        program_string = file.read().strip()
+    conn = Connection(IntcodeComputer(program_string))
 
     scaffold_map = ScaffoldMap()
     frame, _ = get_camera_frame(conn)
@@ -204,8 +114,6 @@ if __name__ == "__main__":
         if len({s+1, s-1, s+1j, s-1j} & scaffold_map.tiles[TileType.SCAFFOLD]) > 2: acc += int(s.real)*int(s.imag)
     print(f'Puzzle 1 solution is: {acc}')
 
-    p.join()
-
     input('Press ENTER to move to Puzzle 2...')
 
     #
@@ -251,9 +159,9 @@ if __name__ == "__main__":
         break
     
     # Now we are ready to run the computer
-    conn, child_conn = Pipe()
-    p = Process(target=modified_computer_main, args=(child_conn,))
-    p.start()
+    computer = IntcodeComputer(program_string)
+    computer.write(0, 2) # Alter the program to accept commands
+    conn = Connection(computer)
 
     send_string = f'{main_routine}\n{a_pattern}\n{b_pattern}\n{c_pattern}\ny\n'
     for c in send_string: conn.send(ord(c))
@@ -266,6 +174,3 @@ if __name__ == "__main__":
         print(frame + '\033[43A', end='')
 
     print(f'\033[43B\nPuzzle 2 solution is: {ret_val}')
-
-    # Terminate instead of join since the program runs a never ending loop
-    p.terminate()
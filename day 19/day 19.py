@@ -1,102 +1,71 @@
-from multiprocessing import Process, Pipe
+import os, sys
+from collections import OrderedDict
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from intcode import IntcodeComputer
 
 #
-# Classes
+# Constants
 #
-class IntcodeComputer:
-    """This is a version of the Intcode computer that expects to be run in a separate process, and communicate using a Pipe"""
-    def __init__(self, program_string: str) -> None:
-        self.program = list(map(int, program_string.split(',')))
-
-    def expand_memory(self, size: int) -> None:
-        """Enpand the program memory of the computer with 'size' values"""
-        self.program.extend([0] * size)
-
-    def backup(self) -> None:
-        """Backup the current program memory of the computer (note: does not save instruction pointer or relative base)"""
-        self.program_backup = self.program.copy()
-
-    def restore(self) -> None:
-        """Restore the program memory of the computer"""
-        self.program = self.program_backup.copy()
-
-    def fetch(self, pos: int, param_mode: int, rel_base: int) -> int:
-        """Fetches a value from the program at position 'pos' using parameter mode 'mode'"""
-        match param_mode:
-            case 0: return self.program[self.program[pos]]              # Position mode
-            case 1: return self.program[pos]                            # Absolute mode
-            case 2: return self.program[rel_base + self.program[pos]]   # Relative mode
-
-    def stor(self, pos: int, param_mode: int, rel_base: int, val: int) -> None:
-        """Stores a value in the program at position 'pos' using parameter mode 'mode'"""
-        match param_mode:
-            case 0: self.program[self.program[pos]] = val               # Position mode
-            case 1: self.program[pos] = val                             # Absolute mode
-            case 2: self.program[rel_base + self.program[pos]] = val    # Relative mode
-
-    def execute(self, conn: Pipe) -> None:
-        """Executes the program, with communication with host process happening through Pipe object"""
-        instr_ptr = 0
-        rel_base = 0
+CACHE_SIZE = 4096   # Number of probe results the beam oracle keeps
+MAX_SLOPE = 10      # The beam is assumed to lie left of x = MAX_SLOPE * (y + 1), so an empty row can be given up on
 
-        while True:
-            op_code = self.program[instr_ptr] % 100
-            param_mode = self.program[instr_ptr] // 100
-
-            match op_code:
-                case 1:     # Addition
-                    self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, self.fetch(instr_ptr + 1, param_mode % 10, rel_base) + self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base))
-                    instr_ptr += 4
-                case 2:     # Multiplication
-                    self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, self.fetch(instr_ptr + 1, param_mode % 10, rel_base) * self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base))
-                    instr_ptr += 4
-                case 3:     # Input data
-                    self.stor(instr_ptr + 1, param_mode % 10, rel_base, conn.recv())
-                    instr_ptr += 2
-                case 4:     # Output data
-                    conn.send(self.fetch(instr_ptr + 1, param_mode % 10, rel_base))
-                    instr_ptr += 2
-                case 5:     # Jump if true
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) != 0: instr_ptr = self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base)
-                    else: instr_ptr += 3
-                case 6:     # Jump if false
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) == 0: instr_ptr = self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base)
-                    else: instr_ptr += 3
-                case 7:     # Less than
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) < self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base):
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 1)
-                    else:
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 0)
-                    instr_ptr += 4
-                case 8:     # Equals
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) == self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base):
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 1)
-                    else:
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 0)
-                    instr_ptr += 4
-                case 9:     # Change relative base
-                    rel_base += self.fetch(instr_ptr + 1, param_mode % 10, rel_base)
-                    instr_ptr += 2
-                case 99:    # Break
-                    return
-                case _:
-                    print(f'Error: Unknown opcode {op_code}... aborting.')
-                    return
+#
+# Helper function
+#
+def probe(computer: IntcodeComputer, x: int, y: int) -> int:
+    """Restart the drone program and deploy the drone at (x, y). Returns 1 if it is pulled by the beam, else 0"""
+    computer.restore()
+    return computer.run([x, y])[0]
 
 #
-# Worker processes
+# Classes
 #
-def computer_main(conn):
-    """Main function for the process running the computer. Communicating with other processes using a Pipe object"""
-    with open('day 19/input.txt') as file:
-        program_string = file.read().strip()
-    computer = IntcodeComputer(program_string)
-    computer.expand_memory(100)
-    computer.backup()
-    while True:
-        computer.execute(conn)
-        computer.restore()
-    conn.close()
+class TractorBeam:
+    """Oracle for the shape of the tractor beam. Probes are the expensive operation, so their results are kept in an LRU
+    cache, and the beam is mapped as the left and right edge of every row. Both edges only move right going down, so
+    every row is scanned starting from the edges of the row above, and mapping n rows takes O(n) probes"""
+    def __init__(self, program: str) -> None:
+        self.computer = IntcodeComputer(program)
+        self.computer.backup()
+        self.cache = OrderedDict()
+        self.probes = 0
+        self.rows = []              # Edges of the beam as (left, right) per row, or None for an empty row
+        self.last_edges = (0, 0)    # Edges of the last non-empty row mapped so far
+
+    def pulled(self, x: int, y: int) -> bool:
+        """Whether the drone is pulled by the beam at (x, y)"""
+        if (x, y) in self.cache:
+            self.cache.move_to_end((x, y))
+            return self.cache[(x, y)]
+        self.probes += 1
+        result = self.cache[(x, y)] = probe(self.computer, x, y) == 1
+        if len(self.cache) > CACHE_SIZE: self.cache.popitem(last=False)
+        return result
+
+    def row(self, y: int) -> tuple | None:
+        """Edges of the beam in row 'y' as (left, right), or None if the beam doesn't reach the row"""
+        while len(self.rows) <= y: self.rows.append(self.scan_row(len(self.rows)))
+        return self.rows[y]
+
+    def scan_row(self, y: int) -> tuple | None:
+        """Find the edges of the beam in row 'y', starting from the edges of the last non-empty row above it"""
+        left, right = self.last_edges
+        while not self.pulled(left, y):
+            left += 1
+            if left > MAX_SLOPE * (y + 1): return None
+        right = max(right, left)
+        while self.pulled(right + 1, y): right += 1
+        self.last_edges = (left, right)
+        return self.last_edges
+
+    def fit_square(self, size: int) -> tuple:
+        """Top left corner of the square of 'size' by 'size' that fits in the beam closest to the emitter"""
+        y = size - 1
+        while True:
+            bottom, top = self.row(y), self.row(y - size + 1)
+            if bottom is not None and top is not None and top[1] >= bottom[0] + size - 1:
+                return bottom[0], y - size + 1
+            y += 1
 
 #
 # Main function
@@ -105,20 +74,21 @@ if __name__ == "__main__":
     #
     # Puzzle 1
     #
-    conn, child_conn = Pipe()
-    p = Process(target=computer_main, args=(child_conn,))
-    p.start()
+    with open('day 19/input.txt') as file:
+        program_string = file.read().strip()
+
+    # Probe the whole 50x50 area at once, one instance per coordinate
+    from intcode.lockstep import LockstepComputer     # Needs numpy, which the beam search doesn't
+    probes = LockstepComputer(program_string, 50 * 50)
+    pulled = probes.run([[x, y] for y in range(50) for x in range(50)])
 
     acc = 0
     beam_view = ''
     for y in range(50):
         for x in range(50):
-            conn.send(x)
-            conn.send(y)
-            if conn.recv() == 1:
+            if pulled[50 * y + x][0] == 1:
                 beam_view += '#'
                 acc += 1
-                puzzle2_start = (x, y)
             else:
                 beam_view += '.'
         beam_view += '\n'
@@ -130,44 +100,6 @@ if __name__ == "__main__":
     #
     # Puzzle 2
     #
-    x, y = puzzle2_start
-    diag_len = 0
-    start_points = []
-    while diag_len < 100:
-        while True: # Move down
-            y += 1
-            conn.send(x)
-            conn.send(y)
-            if conn.recv() == 0: break
-
-        diag_len = 0
-        y -= 1
-        start_points.append((x, y))
-        while True: # Move diagonally up
-            x += 1
-            y -= 1
-            diag_len += 1
-            conn.send(x)
-            conn.send(y)
-            if conn.recv() == 0: break
-        x -= 1
-        y += 1
-
-    # Fine grained search between the last two diagonal searches
-    for x in range(start_points[-2][0], start_points[-1][0]):
-        for y in range(start_points[-2][1], start_points[-1][1]):
-            for i in range(0, 100, 99):
-                conn.send(x+i)
-                conn.send(y-i)
-                if conn.recv() == 0:
-                    break
-            else:
-                y -= 99
-                break
-        else: continue
-        break
-
-    print(f'Puzzle 2 solution is: {x*10000 + y} (x={x}, y={y})')
-
-    p.terminate()
-    p.join()
+    beam = TractorBeam(program_string)
+    x, y = beam.fit_square(100)
+    print(f'Puzzle 2 solution is: {x*10000 + y} (x={x}, y={y}, {beam.probes} probes)')
@@ -1,20 +1,46 @@
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from intcode import IntcodeComputer, SymbolicError, execute_symbolic
+
 #
 # Functions
 #
-def execute_program(program: list, noun: int, verb: int):
-    program[1] = noun
-    program[2] = verb
-    instr_ptr = 0
-    while True:
-        match program[instr_ptr]:
-            case 1: # Addition
-                program[program[instr_ptr + 3]] = program[program[instr_ptr + 1]] + program[program[instr_ptr + 2]]
-                instr_ptr += 4
-            case 2: # Multiplication
-                program[program[instr_ptr + 3]] = program[program[instr_ptr + 1]] * program[program[instr_ptr + 2]]
-                instr_ptr += 4
-            case 99: # End of program
-                break
+def execute_program(program: list, noun: int, verb: int) -> int:
+    """Run the program with the given noun and verb and return the value left at address 0"""
+    computer = IntcodeComputer(program)
+    computer.write(1, noun)
+    computer.write(2, verb)
+    computer.execute()
+    return computer.read(0)
+
+def sweep_program(program: list, target: int) -> list:
+    """Run all 100x100 noun and verb combinations at once, and return the ones leaving 'target' at address 0"""
+    from intcode.lockstep import LockstepComputer     # Needs numpy, which the symbolic solution doesn't
+    computers = LockstepComputer(program, 100 * 100)
+    computers.write(1, [noun for noun in range(100) for verb in range(100)])
+    computers.write(2, [verb for noun in range(100) for verb in range(100)])
+    computers.run()
+    return [divmod(i, 100) for i, val in enumerate(computers.read(0)) if val == target]
+
+def solve_program(program: list, target: int) -> list:
+    """Find the noun and verb combinations leaving 'target' at address 0 by running the program once with symbolic
+    noun and verb, and solving the resulting linear expression. Falls back to a sweep if that is not possible"""
+    try:
+        result = execute_symbolic(program, { 1: 'noun', 2: 'verb' })[0]
+        if result is None: raise SymbolicError('Result depends on a symbolic address')
+    except SymbolicError:
+        return sweep_program(program, target)
+
+    a = result.coeffs.get('noun', 0)
+    b = result.coeffs.get('verb', 0)
+    candidates = []
+    for noun in range(100):
+        rest = target - result.const - a * noun
+        if b == 0: candidates += [(noun, verb) for verb in range(100)] if rest == 0 else []
+        elif rest % b == 0 and 0 <= rest // b < 100: candidates.append((noun, rest // b))
+
+    # Confirm the few candidates left by running them for real
+    return [(noun, verb) for noun, verb in candidates if execute_program(program, noun, verb) == target]
 
 #
 # Process input
@@ -25,18 +51,11 @@ with open('day 2/input.txt', 'r') as file:
 #
 # Puzzle 1
 #
-program = program_original.copy()
-execute_program(program, 12, 2)
-
-print(f'Puzzle 1 solution is: {program[0]}')
+print(f'Puzzle 1 solution is: {execute_program(program_original, 12, 2)}')
 
 #
 # Puzzle 2
 #
 target = 19690720
-for noun in range(100):
-    for verb in range(100):
-        program = program_original.copy()
-        execute_program(program, noun, verb)
-        if program[0] == target:
-            print(f'Puzzle 2 solution is: {100 * noun + verb}')
+for noun, verb in solve_program(program_original, target):
+    print(f'Puzzle 2 solution is: {100 * noun + verb}')
@@ -1,104 +1,6 @@
-import functools
-from multiprocessing import Process, Pipe
-
-#
-# Classes
-#
-class IntcodeComputer:
-    """This is a version of the Intcode computer that expects to be run in a separate process, and communicate using a Pipe"""
-    def __init__(self, program_string: str) -> None:
-        self.program = list(map(int, program_string.split(',')))
-
-    def expand_memory(self, size: int) -> None:
-        """Enpand the program memory of the computer with 'size' values"""
-        self.program.extend([0] * size)
-
-    def backup(self) -> None:
-        """Backup the current program memory of the computer (note: does not save instruction pointer or relative base)"""
-        self.program_backup = self.program.copy()
-
-    def restore(self) -> None:
-        """Restore the program memory of the computer"""
-        self.program = self.program_backup.copy()
-
-    def fetch(self, pos: int, param_mode: int, rel_base: int) -> int:
-        """Fetches a value from the program at position 'pos' using parameter mode 'mode'"""
-        match param_mode:
-            case 0: return self.program[self.program[pos]]              # Position mode
-            case 1: return self.program[pos]                            # Absolute mode
-            case 2: return self.program[rel_base + self.program[pos]]   # Relative mode
-
-    def stor(self, pos: int, param_mode: int, rel_base: int, val: int) -> None:
-        """Stores a value in the program at position 'pos' using parameter mode 'mode'"""
-        match param_mode:
-            case 0: self.program[self.program[pos]] = val               # Position mode
-            case 1: self.program[pos] = val                             # Absolute mode
-            case 2: self.program[rel_base + self.program[pos]] = val    # Relative mode
-
-    def execute(self, conn: Pipe) -> None:
-        """Executes the program, with communication with host process happening through Pipe object"""
-        instr_ptr = 0
-        rel_base = 0
-
-        while True:
-            op_code = self.program[instr_ptr] % 100
-            param_mode = self.program[instr_ptr] // 100
-
-            match op_code:
-                case 1:     # Addition
-                    self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, self.fetch(instr_ptr + 1, param_mode % 10, rel_base) + self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base))
-                    instr_ptr += 4
-                case 2:     # Multiplication
-                    self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, self.fetch(instr_ptr + 1, param_mode % 10, rel_base) * self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base))
-                    instr_ptr += 4
-                case 3:     # Input data
-                    self.stor(instr_ptr + 1, param_mode % 10, rel_base, conn.recv())
-                    instr_ptr += 2
-                case 4:     # Output data
-                    conn.send(self.fetch(instr_ptr + 1, param_mode % 10, rel_base))
-                    instr_ptr += 2
-                case 5:     # Jump if true
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) != 0: instr_ptr = self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base)
-                    else: instr_ptr += 3
-                case 6:     # Jump if false
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) == 0: instr_ptr = self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base)
-                    else: instr_ptr += 3
-                case 7:     # Less than
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) < self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base):
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 1)
-                    else:
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 0)
-                    instr_ptr += 4
-                case 8:     # Equals
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) == self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base):
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 1)
-                    else:
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 0)
-                    instr_ptr += 4
-                case 9:     # Change relative base
-                    rel_base += self.fetch(instr_ptr + 1, param_mode % 10, rel_base)
-                    instr_ptr += 2
-                case 99:    # Break
-                    return
-                case _:
-                    print(f'Error: Unknown opcode {op_code}... aborting.')
-                    return
-
-#
-# Worker processes
-#
-def computer_main(conn):
-    """Main function for the process running the computer. Communicating with other processes using a Pipe object"""
-    with open('day 21/input.txt') as file:
-        program_string = file.read().strip()
-    computer = IntcodeComputer(program_string)
-    computer.expand_memory(1000)
-    computer.backup()
-    while True:
-        computer.execute(conn)
-        conn.send(-1) # Send reboot
-        computer.restore()
-    conn.close()
+import os, sys, functools
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from intcode import IntcodeComputer, ExecutionMode, Connection, first_match
 
 #
 # Constants
@@ -112,18 +14,17 @@ INSTRUCTIONS = [
 #
 # Helper function
 #
-def readline(conn: Pipe) -> tuple:
+def readline(conn: Connection) -> tuple:
+    """Receive a line of ASCII output. Also returns any non-ASCII value received, or -1 if the program has halted"""
     line = ''
     char = None
     while line[-1:] != '\n':
-        char = conn.recv()
+        try: char = conn.recv()
+        except EOFError: return line, -1    # The droid fell into space, and the program has to be rebooted
         if not 0 <= char < 256: return line, char
         line += chr(char)
     return line[:-1], None
 
-def sendline(conn: Pipe, string: str) -> None:
-    for c in string+'\n': conn.send(ord(c))
-
 @functools.cache
 def get_instruction(number: int) -> str:
     """Get the text instruction matching a value between 0-35"""
@@ -141,6 +42,15 @@ def get_instructions(number: int) -> str:
         number //= 36
     return instructions
 
+def feed_script(computer: IntcodeComputer, item: tuple) -> list:
+    """Input for a springscript candidate, given as (instructions number, WALK or RUN)"""
+    number, command = item
+    return list(map(ord, get_instructions(number) + command + '\n'))
+
+def collect_damage(computer: IntcodeComputer, outputs: list) -> int | None:
+    """The hull damage reported by a springscript candidate, or None if the droid fell into space"""
+    return outputs[-1] if outputs and outputs[-1] > 255 else None
+
 #
 # Main function
 #
@@ -166,9 +76,27 @@ if __name__ == "__main__":
     # > OR T J
     # > RUN
     #
-    conn, child_conn = Pipe()
-    p = Process(target=computer_main, args=(child_conn,))
-    p.start()
+    with open('day 21/input.txt') as file:
+        program_string = file.read().strip()
+
+    # Usage: day 21.py [WALK|RUN] [max instructions] searches all springscript programs up to the given length, in
+    # parallel, instead of asking for one
+    if len(sys.argv) > 1:
+        command = sys.argv[1]
+        max_length = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+        candidates = ((number, command) for number in range(1, 36 ** max_length))
+        match = first_match(program_string, candidates, lambda damage: damage is not None, feed=feed_script,
+                            collect=collect_damage)
+        if match is None: print(f'No springscript of up to {max_length} instructions survives')
+        else:
+            (number, _), damage = match
+            print(get_instructions(number) + command)
+            print(f'Puzzle solution is: {damage}')
+        sys.exit()
+
+    computer = IntcodeComputer(program_string, ExecutionMode.COMPILED)
+    computer.backup()
+    conn = Connection(computer)
 
     while True:
         print(readline(conn)[0])
@@ -176,7 +104,7 @@ if __name__ == "__main__":
         command = ''
         while command not in ('WALK', 'RUN'):
             command = input('> ')
-            sendline(conn, command)
+            conn.sendline(command)
         while True:
             line, val = readline(conn)
             print(line)
@@ -186,4 +114,6 @@ if __name__ == "__main__":
             print(f'Puzzle solution is: {val}')
             break
 
-    p.kill()
+        # Reboot the springdroid
+        computer.restore()
+        conn = Connection(computer)
@@ -1,135 +1,136 @@
-import time
+import os, sys
+from collections import deque
 from multiprocessing import Process, Pipe
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from intcode import IntcodeComputer, ExecutionMode, Channel
+
+#
+# Constants
+#
+NETWORK_SIZE = 50
+NAT_ADDRESS = 255
 
 #
 # Classes
 #
-class IntcodeComputer:
-    """This is a version of the Intcode computer that expects to be run in a separate process, and communicate using a Pipe"""
-    def __init__(self, program_string: str, conn: Pipe, address: int) -> None:
-        self.program = list(map(int, program_string.split(',')))
-        self.conn = conn
-        self.send_buffer = []
-        self.recv_buffer = [ address ]
+class NetworkInterface:
+    """Network interface of a computer on the network. Packets sent are routed straight into the receive queue of
+    their destination, and an empty receive queue reads as -1"""
+    def __init__(self, network: 'Network', address: int) -> None:
+        self.network = network
         self.address = address
-        self.idle_timer = None
-
-    def expand_memory(self, size: int) -> None:
-        """Enpand the program memory of the computer with 'size' values"""
-        self.program.extend([0] * size)
-
-    def backup(self) -> None:
-        """Backup the current program memory of the computer (note: does not save instruction pointer or relative base)"""
-        self.program_backup = self.program.copy()
-
-    def restore(self) -> None:
-        """Restore the program memory of the computer"""
-        self.program = self.program_backup.copy()
-
-    def fetch(self, pos: int, param_mode: int, rel_base: int) -> int:
-        """Fetches a value from the program at position 'pos' using parameter mode 'mode'"""
-        match param_mode:
-            case 0: return self.program[self.program[pos]]              # Position mode
-            case 1: return self.program[pos]                            # Absolute mode
-            case 2: return self.program[rel_base + self.program[pos]]   # Relative mode
-
-    def stor(self, pos: int, param_mode: int, rel_base: int, val: int) -> None:
-        """Stores a value in the program at position 'pos' using parameter mode 'mode'"""
-        match param_mode:
-            case 0: self.program[self.program[pos]] = val               # Position mode
-            case 1: self.program[pos] = val                             # Absolute mode
-            case 2: self.program[rel_base + self.program[pos]] = val    # Relative mode
+        self.recv_queue = deque([ address ])
+        self.send_buffer = []
+        self.idle = False           # Last poll found the queue empty, and nothing has been sent since
+        self.polled_empty = False   # The queue has been found empty during the current time slice
 
     def send(self, data: int) -> None:
-        """Use the computer's Pipe object to send data"""
-        self.idle_timer = None # Reset idle timer
+        """Collect output of the computer, and route it as soon as a whole packet is complete"""
+        self.idle = False
         self.send_buffer.append(data)
-        if len(self.send_buffer) > 2: # Send data every 3rd instruction
-            self.conn.send(self.send_buffer)
+        if len(self.send_buffer) == 3:
+            self.network.route(*self.send_buffer)
             self.send_buffer.clear()
 
-    def recv(self) -> int:
-        """Use the computer's Pipe object to receive data"""
-        if len(self.recv_buffer) > 0:
-            self.idle_timer = None # Reset idle timer
-            return self.recv_buffer.pop(0)
-        elif self.conn.poll(0.02):
-            self.idle_timer = None # Reset idle timer
-            self.recv_buffer = self.conn.recv()
-            return self.recv_buffer.pop(0)
-        else:
-            if self.idle_timer is None: self.idle_timer = time.time()
-            idle_time = time.time() - self.idle_timer
-            if idle_time > 0.1:
-                # print(f'Warning: Node {self.address} has been idle for {idle_time:.2f} seconds')
-                self.conn.send((-1, self.address, self.idle_timer)) # Send request for help packet to get latest value from NAT
-                self.idle_timer = None
-            return -1
-
-    def execute(self) -> None:
-        """Executes the program"""
-        instr_ptr = 0
-        rel_base = 0
-
-        while True:
-            op_code = self.program[instr_ptr] % 100
-            param_mode = self.program[instr_ptr] // 100
-
-            match op_code:
-                case 1:     # Addition
-                    self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, self.fetch(instr_ptr + 1, param_mode % 10, rel_base) + self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base))
-                    instr_ptr += 4
-                case 2:     # Multiplication
-                    self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, self.fetch(instr_ptr + 1, param_mode % 10, rel_base) * self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base))
-                    instr_ptr += 4
-                case 3:     # Input data
-                    self.stor(instr_ptr + 1, param_mode % 10, rel_base, self.recv())
-                    instr_ptr += 2
-                case 4:     # Output data
-                    self.send(self.fetch(instr_ptr + 1, param_mode % 10, rel_base))
-                    instr_ptr += 2
-                case 5:     # Jump if true
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) != 0: instr_ptr = self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base)
-                    else: instr_ptr += 3
-                case 6:     # Jump if false
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) == 0: instr_ptr = self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base)
-                    else: instr_ptr += 3
-                case 7:     # Less than
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) < self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base):
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 1)
-                    else:
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 0)
-                    instr_ptr += 4
-                case 8:     # Equals
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) == self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base):
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 1)
-                    else:
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 0)
-                    instr_ptr += 4
-                case 9:     # Change relative base
-                    rel_base += self.fetch(instr_ptr + 1, param_mode % 10, rel_base)
-                    instr_ptr += 2
-                case 99:    # Break
-                    return
-                case _:
-                    print(f'Error: Unknown opcode {op_code}... aborting.')
-                    return
+    def recv(self) -> int | None:
+        """Input for the computer. The second time in a time slice that the queue is empty, the computer yields"""
+        if len(self.recv_queue) > 0:
+            self.idle = False
+            return self.recv_queue.popleft()
+        if self.polled_empty: return None
+        self.polled_empty = True
+        self.idle = True
+        return -1
+
+class Network:
+    """The computers at a range of addresses, run in one process by a cooperative round robin scheduler. Every
+    computer runs until it has polled its empty receive queue twice, so a time slice ends exactly when a computer has
+    nothing left to do. Packets for addresses outside of the range, the NAT included, are collected in the outbox"""
+    def __init__(self, program: str, addresses: range) -> None:
+        # Parse the program once, and let all computers share its memory copy-on-write
+        computer = IntcodeComputer(program, ExecutionMode.COMPILED)
+        self.computers = [ computer.fork() for _ in addresses ]
+        self.nics = { address: NetworkInterface(self, address) for address in addresses }
+        self.outbox = []
+
+    def route(self, dest: int, x: int, y: int) -> None:
+        """Deliver a packet to the receive queue of its destination, or to the outbox"""
+        if dest in self.nics: self.nics[dest].recv_queue.extend((x, y))
+        else: self.outbox += [dest, x, y]
+
+    def deliver(self, packets: list) -> None:
+        """Deliver packets from outside of the network, given as flat (destination, X, Y) values"""
+        for i in range(0, len(packets), 3): self.route(*packets[i:i+3])
+
+    def run_slice(self) -> list:
+        """Give every computer one time slice. Returns the outbox, and starts a new one"""
+        for computer, nic in zip(self.computers, self.nics.values()):
+            nic.polled_empty = False
+            computer.execute(nic.recv, nic.send)
+        outbox = self.outbox
+        self.outbox = []
+        return outbox
+
+    def is_idle(self) -> bool:
+        """Whether every receive queue is empty and every computer has polled -1 since it last sent anything"""
+        return all(nic.idle and len(nic.recv_queue) == 0 for nic in self.nics.values())
+
+class LocalShard:
+    """A range of addresses simulated in this process"""
+    def __init__(self, program: str, addresses: range) -> None:
+        self.network = Network(program, addresses)
+        self.outbox = []
+
+    def start(self, packets: list) -> None:
+        """Deliver the incoming packets, and run one scheduling round"""
+        self.network.deliver(packets)
+        self.outbox = self.network.run_slice()
+
+    def finish(self) -> tuple:
+        """Result of the round: whether the shard is idle, and the packets it sent outside"""
+        return self.network.is_idle(), self.outbox
+
+    def close(self) -> None:
+        pass
+
+class RemoteShard:
+    """A range of addresses simulated by a worker process. Packets are exchanged as one frame per scheduling round in
+    each direction, so all workers run their rounds in parallel"""
+    def __init__(self, program: str, addresses: range) -> None:
+        conn, child_conn = Pipe()
+        self.process = Process(target=shard_main, args=(child_conn, program, addresses))
+        self.process.start()
+        child_conn.close()
+        self.channel = Channel(conn)
 
-#
-# Worker processes
-#
-def computer_main(conn):
-    """Main function for the process running the computer. Communicating with other processes using a Pipe object"""
-    with open('day 23/input.txt') as file:
-        program_string = file.read().strip()
+    def start(self, packets: list) -> None:
+        self.channel.send(packets)
+
+    def finish(self) -> tuple:
+        idle, *outbox = self.channel.recv()
+        return idle == 1, outbox
 
-    # Initialize the computer by also assigning the address received as the first entry in the Pipe
-    computer = IntcodeComputer(program_string, conn, conn.recv())
-    computer.expand_memory(100)
+    def close(self) -> None:
+        # Workers forked later hold copies of this end of the Pipe, so the worker would never see EOF
+        self.channel.close()
+        self.process.terminate()
+        self.process.join()
 
-    # Start the program
-    computer.execute()
-    conn.close()
+#
+# Process functions
+#
+def shard_main(conn, program: str, addresses: range) -> None:
+    """Main function of a worker process simulating a shard of the network. Every frame received holds the packets
+    for one scheduling round, and is answered by a frame of the idle state followed by the packets sent outside"""
+    channel = Channel(conn)
+    network = Network(program, addresses)
+    while True:
+        try: packets = channel.recv()
+        except EOFError: break
+        network.deliver(packets)
+        outbox = network.run_slice()
+        channel.send([int(network.is_idle())] + outbox)
+    channel.close()
 
 #
 # Main function
@@ -138,48 +139,48 @@ if __name__ == "__main__":
     #
     # Puzzle 1 and 2
     #
-    connections = []
-    processes = []
-    for i in range(50):
-        conn, child_conn = Pipe()
-        p = Process(target=computer_main, args=(child_conn,))
-        p.start()
-        conn.send(i)
-        processes.append(p)
-        connections.append(conn)
+    # Usage: day 23.py [network size] [worker processes], where 0 worker processes runs the network in this process
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else NETWORK_SIZE
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    with open('day 23/input.txt') as file:
+        program = file.read().strip()
 
-    # Initialize idle timers such that noone indicates idle
-    latest_nat_update = time.time()
-    idle_timers = [ latest_nat_update-1 ] * 50
+    # Split the addresses in contiguous ranges, one per shard
+    shard_size = -(-size // max(workers, 1))
+    shards = [ (RemoteShard if workers > 0 else LocalShard)(program, range(first, min(first + shard_size, size)))
+               for first in range(0, size, shard_size) ]
 
     print(f'Starting communication: ', end='')
 
-    # Keep track of latest NAT package(s)
-    nat_x = None
+    # Scheduling rounds are a global barrier: packets between shards arrive in the next round, and the NAT only wakes
+    # up the network when all shards are idle and no packets are underway, which keeps its behaviour deterministic
+    inboxes = [ [] for _ in shards ]
+    nat_packet = None
     nat_y = None
-    nat_ys = []
+    puzzle1_solved = False
     while True:
-        for c in connections:
-            if c.poll():
-                dest, x, y = c.recv()
-                if 0 <= dest < 50:  # "Normal" packet
-                    connections[dest].send([x, y])
-                elif dest == 255:   # NAT packet
-                    if nat_y is None:
+        for shard, inbox in zip(shards, inboxes): shard.start(inbox)
+        results = [ shard.finish() for shard in shards ]
+
+        inboxes = [ [] for _ in shards ]
+        for _, outbox in results:
+            for i in range(0, len(outbox), 3):
+                dest, x, y = outbox[i:i+3]
+                if dest == NAT_ADDRESS:
+                    if not puzzle1_solved:
                         print(f'\nPuzzle 1 solution is: {y}')
-                    nat_x = x
-                    nat_y = y
-                elif dest == -1:    # "Idle node" packet of structure (-1, node id, idle timer)
-                    idle_timers[x] = y
-                    if all(x > latest_nat_update for x in idle_timers):
-                        connections[0].send([nat_x, nat_y])
-                        latest_nat_update = time.time()
-
-                        # Same Y value has been sent twice in a row (Puzzle 2 solution)
-                        nat_ys.append(nat_y)
-                        if len(nat_ys) >= 2 and nat_ys[-2] == nat_ys[-1]:
-                            print(f'Puzzle 2 solution is: {nat_y}')
-                            for p in processes: p.terminate()
-                            exit()
-
-    # p.join()
+                        puzzle1_solved = True
+                    nat_packet = (x, y)
+                elif 0 <= dest < size: inboxes[dest // shard_size] += [dest, x, y]
+        if not all(idle for idle, _ in results) or any(inboxes) or nat_packet is None: continue
+
+        # Wake up the network by resending the latest NAT packet to address 0
+        x, y = nat_packet
+        inboxes[0] += [0, x, y]
+        if y == nat_y:
+            print(f'Puzzle 2 solution is: {y}')
+            break
+        nat_y = y
+
+    for shard in shards: shard.close()
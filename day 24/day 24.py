@@ -1,3 +1,7 @@
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from terminal import Renderer
+
 #
 # Classes
 #
@@ -39,16 +43,13 @@ class ErisModel:
     def get_id(self, tile: complex) -> int:
         return int(tile.real) + 5*int(tile.imag)
 
-    def draw(self, state = None):
+    def draw(self, renderer: Renderer, state = None):
         if state is None: state = self.state
-        state_string = ''
         for r in range(5):
             for c in range(5):
-                if state & 1: state_string += '#'
-                else: state_string += '.'
+                renderer[c+r*1j] = '#' if state & 1 else '.'
                 state >>= 1
-            state_string += '\n'
-        print(state_string)
+        renderer.frame()
 
     def evolve(self):
         state = self.state
@@ -89,18 +90,17 @@ class RecursiveErisModel:
             neighbors.remove((nb, dim))
         return neighbors
         
-    def draw(self):
+    def draw(self, renderer: Renderer):
+        # Depths are drawn side by side, one column apart
         dim = {d for _, d in self.bugs}
         for d in range(min(dim), max(dim)+1):
-            print(f'Depth {d}:')
-            state_string = ''
             for r in range(5):
                 for c in range(5):
-                    if r == 2 and c == 2: state_string += '?'
-                    elif (c+r*1j, d) in self.bugs: state_string += '#'
-                    else: state_string += '.'
-                state_string += '\n'
-            print(state_string)
+                    if r == 2 and c == 2: renderer[c+6*d+r*1j] = '?'
+                    elif (c+r*1j, d) in self.bugs: renderer[c+6*d+r*1j] = '#'
+                    else: renderer[c+6*d+r*1j] = '.'
+        renderer.status(f'Depth {min(dim)} to {max(dim)}')
+        renderer.frame()
 
     def evolve(self):
         next_bugs = set()
@@ -114,6 +114,8 @@ class RecursiveErisModel:
 #
 # Process input
 #
+# Usage: day 24.py [render], where the evolution is only drawn when asked to
+render = len(sys.argv) > 1 and sys.argv[1] == 'render'
 with open('day 24/input.txt') as file:
     map_string = file.read()
     eris_model = ErisModel(map_string)
@@ -124,16 +126,22 @@ with open('day 24/input.txt') as file:
 #
 i = 0
 seen = set()
+renderer = Renderer() if render else None
 while not eris_model.state in seen:
     seen.add(eris_model.state)
     eris_model.evolve()
+    if render: eris_model.draw(renderer)
+if render: renderer.close()
 
 print(f'Puzzle 1 solution is: {eris_model.state} (after {len(seen)} iterations)')
 
 #
 # Puzzle 2
 #
+renderer = Renderer() if render else None
 for i in range(200):
     recursive_eris_model.evolve()
+    if render: recursive_eris_model.draw(renderer)
+if render: renderer.close()
 
 print(f'Puzzle 2 solution is: {len(recursive_eris_model.bugs)}')
\ No newline at end of file
@@ -1,89 +1,15 @@
-import re
-from multiprocessing import Process, Pipe
+import os, sys, re, json, hashlib
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from intcode import IntcodeComputer, ExecutionMode, Connection, save_checkpoint, load_checkpoint, first_match
 
 #
-# Classes
+# Constants
 #
-class IntcodeComputer:
-    """This is a version of the Intcode computer that expects to be run in a separate process, and communicate using a Pipe"""
-    def __init__(self, program_string: str) -> None:
-        self.program = list(map(int, program_string.split(',')))
-
-    def expand_memory(self, size: int) -> None:
-        """Enpand the program memory of the computer with 'size' values"""
-        self.program.extend([0] * size)
-
-    def backup(self) -> None:
-        """Backup the current program memory of the computer (note: does not save instruction pointer or relative base)"""
-        self.program_backup = self.program.copy()
-
-    def restore(self) -> None:
-        """Restore the program memory of the computer"""
-        self.program = self.program_backup.copy()
-
-    def fetch(self, pos: int, param_mode: int, rel_base: int) -> int:
-        """Fetches a value from the program at position 'pos' using parameter mode 'mode'"""
-        match param_mode:
-            case 0: return self.program[self.program[pos]]              # Position mode
-            case 1: return self.program[pos]                            # Absolute mode
-            case 2: return self.program[rel_base + self.program[pos]]   # Relative mode
-
-    def stor(self, pos: int, param_mode: int, rel_base: int, val: int) -> None:
-        """Stores a value in the program at position 'pos' using parameter mode 'mode'"""
-        match param_mode:
-            case 0: self.program[self.program[pos]] = val               # Position mode
-            case 1: self.program[pos] = val                             # Absolute mode
-            case 2: self.program[rel_base + self.program[pos]] = val    # Relative mode
-
-    def execute(self, conn: Pipe) -> None:
-        """Executes the program, with communication with host process happening through Pipe object"""
-        instr_ptr = 0
-        rel_base = 0
-
-        while True:
-            op_code = self.program[instr_ptr] % 100
-            param_mode = self.program[instr_ptr] // 100
-
-            match op_code:
-                case 1:     # Addition
-                    self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, self.fetch(instr_ptr + 1, param_mode % 10, rel_base) + self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base))
-                    instr_ptr += 4
-                case 2:     # Multiplication
-                    self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, self.fetch(instr_ptr + 1, param_mode % 10, rel_base) * self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base))
-                    instr_ptr += 4
-                case 3:     # Input data
-                    self.stor(instr_ptr + 1, param_mode % 10, rel_base, conn.recv())
-                    instr_ptr += 2
-                case 4:     # Output data
-                    conn.send(self.fetch(instr_ptr + 1, param_mode % 10, rel_base))
-                    instr_ptr += 2
-                case 5:     # Jump if true
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) != 0: instr_ptr = self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base)
-                    else: instr_ptr += 3
-                case 6:     # Jump if false
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) == 0: instr_ptr = self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base)
-                    else: instr_ptr += 3
-                case 7:     # Less than
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) < self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base):
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 1)
-                    else:
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 0)
-                    instr_ptr += 4
-                case 8:     # Equals
-                    if self.fetch(instr_ptr + 1, param_mode % 10, rel_base) == self.fetch(instr_ptr + 2, param_mode % 100 // 10, rel_base):
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 1)
-                    else:
-                        self.stor(instr_ptr + 3, param_mode % 1000 // 100, rel_base, 0)
-                    instr_ptr += 4
-                case 9:     # Change relative base
-                    rel_base += self.fetch(instr_ptr + 1, param_mode % 10, rel_base)
-                    instr_ptr += 2
-                case 99:    # Break
-                    return
-                case _:
-                    print(f'Error: Unknown opcode {op_code}... aborting.')
-                    return
+CHECKPOINT = 'day 25/checkpoint.bin'    # State after collecting all items, saved to skip the collection on later runs
 
+#
+# Classes
+#
 class Inventory:
     def __init__(self) -> None:
         self.dictionary = {}
@@ -111,72 +37,85 @@ class Inventory:
         return drops + takes
 
 #
-# Worker processes
+# Helper functions
 #
-def computer_main(conn):
-    """Main function for the process running the computer. Communicating with other processes using a Pipe object"""
-    with open('day 25/input.txt') as file:
-        program_string = file.read().strip()
-    computer = IntcodeComputer(program_string)
-    computer.expand_memory(1000)
-    computer.execute(conn)
-    conn.close()
+def feed_exchange(computer: IntcodeComputer, item: tuple) -> list:
+    """Input for an inventory candidate, given as (inventory bits, commands to get it from the collected inventory):
+    exchange the items, and step onto the pressure-sensitive floor"""
+    _, commands = item
+    return list(map(ord, ''.join(f'{command}\n' for command in commands + ('north',))))
 
-#
-# Helper function
-#
-def readline(conn: Pipe) -> tuple:
-    line = ''
-    while line[-1:] != '\n':
-        line += chr(conn.recv())
-    return line[:-1]
-
-def sendline(conn: Pipe, string: str) -> None:
-    for c in string+'\n': conn.send(ord(c))
+def collect_reply(computer: IntcodeComputer, outputs: list) -> str | None:
+    """The text the droid got back for an inventory candidate, or None if it was ejected from the floor again"""
+    return ''.join(map(chr, outputs)) if computer.has_completed() else None
 
 #
 # Main function
 #
 if __name__ == "__main__":
-    conn, child_conn = Pipe()
-    p = Process(target=computer_main, args=(child_conn,))
-    p.start()
-
+    with open('day 25/input.txt') as file:
+        program_string = file.read().strip()
     with open('day 25/commands.txt') as file:
         commands = file.read().splitlines()
-
+    computer = IntcodeComputer(program_string, ExecutionMode.COMPILED)
     inventory = Inventory()
 
-    # Automate collection of items
-    while len(commands) > 0:
-        if not conn.poll(0.1):
-            command = commands.pop(0)
-            print(f'> {command}')
-            sendline(conn, command)
-        else:
-            line = readline(conn)
-            inventory.process_line(line)
-            print(line)
-
-    # Loop through all possible inventory combinations
-    i = 1
-    commands = inventory.exchange_items(i) + ['north']
-    while True:
-        if not p.is_alive(): break
-        elif not conn.poll(0.1):
-            if len(commands) > 0:
+    # The checkpoint is only valid for the program and commands it was saved with
+    source = hashlib.sha256((program_string + '\n' + '\n'.join(commands)).encode()).hexdigest()
+    saved = None
+    if os.path.exists(CHECKPOINT):
+        try:
+            saved = json.loads(load_checkpoint(computer, CHECKPOINT))
+            if saved['source'] != source: saved = None
+            else: items, contents = saved['items'], saved['contents']
+        except (ValueError, KeyError, TypeError):    # Truncated, or not saved by this version
+            print(f'Removing unreadable checkpoint {CHECKPOINT}')
+            os.remove(CHECKPOINT)
+            saved = None
+    if saved is not None:
+        print(f'Starting from checkpoint {CHECKPOINT}')
+        inventory.dictionary = items
+        inventory.contents = contents
+        conn = Connection(computer)
+    else:
+        computer.reset()
+        conn = Connection(computer)
+
+        # Automate collection of items
+        while len(commands) > 0:
+            if not conn.poll():
                 command = commands.pop(0)
                 print(f'> {command}')
-                sendline(conn, command)
-            elif i < 255:
-                i += 1
-                commands = inventory.exchange_items(i) + ['north']
+                conn.sendline(command)
             else:
-                command = input(f'> ')
-                sendline(conn, command)
-        else:
-            line = readline(conn)
+                line = conn.readline()
+                inventory.process_line(line)
+                print(line)
+
+        # Read the response to the last command, and save the state for later runs
+        while conn.poll():
+            line = conn.readline()
             inventory.process_line(line)
             print(line)
-
-    p.join()
+        saved = { 'source': source, 'items': inventory.dictionary, 'contents': inventory.contents }
+        save_checkpoint(computer, CHECKPOINT, json.dumps(saved).encode())
+
+    # Try all inventory combinations in parallel, each from the state after collecting all items
+    candidates = ((i, tuple(inventory.exchange_items(i))) for i in range(1, 1 << len(inventory.dictionary)))
+    found = first_match(computer, candidates, lambda reply: reply is not None, feed=feed_exchange,
+                        collect=collect_reply)
+    if found is not None:
+        (i, commands), reply = found
+        for command in commands + ('north',): print(f'> {command}')
+        print(reply)
+    else:
+        # None of the combinations got past the floor, so leave it to the player
+        while True:
+            if computer.has_completed() and not conn.poll(): break
+            elif not conn.poll():
+                command = input(f'> ')
+                conn.sendline(command)
+            else:
+                line = conn.readline()
+                inventory.process_line(line)
+                print(line)
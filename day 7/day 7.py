@@ -1,101 +1,78 @@
-# Fetches a value from the program 'program' at position 'pos' using parameter mode 'mode'
-def fetch(program, pos, mode):
-    if mode == 0:
-        return program[program[pos]]
-    elif mode == 1:
-        return program[pos]
+import os, sys, time
+from collections import deque
+from itertools import permutations
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from intcode import IntcodeComputer, ExecutionMode
 
-# Executes the program with a given input vector
-def execute_pt1(program, inVec):
-    opPos = 0
-    inPos = 0 # Which value from the input vector to pick up
-
-    # Step through program
-    while True:
-        opCode = program[opPos] % 100   # Extract operand
-        modes = program[opPos] // 100   # Extract parameter modes
-
-        if opCode == 1:                 # Addition
-            program[program[opPos + 3]] = fetch(program, opPos + 1, modes % 10) + fetch(program, opPos + 2, modes % 100 // 10)
-            opPos += 4
-        elif opCode == 2:               # Multiplication
-            program[program[opPos + 3]] = fetch(program, opPos + 1, modes % 10) * fetch(program, opPos + 2, modes % 100 // 10)
-            opPos += 4
-        elif opCode == 3:               # Input data from the input vector
-            program[program[opPos + 1]] = inVec[inPos]
-            inPos += 1
-            opPos += 2
-        elif opCode == 4:               # Return the output data
-            return fetch(program, opPos + 1, modes % 10)
-            #opPos += 2
-        elif opCode == 5:               # Jump if true
-            if fetch(program, opPos + 1, modes % 10) != 0: opPos = fetch(program, opPos + 2, modes % 100 // 10)
-            else: opPos += 3
-        elif opCode == 6:               # Jump if false
-            if fetch(program, opPos + 1, modes % 10) == 0: opPos = fetch(program, opPos + 2, modes % 100 // 10)
-            else: opPos += 3
-        elif opCode == 7:               # Less than
-            if fetch(program, opPos + 1, modes % 10) < fetch(program, opPos + 2, modes % 100 // 10):
-                program[program[opPos + 3]] = 1
-            else:
-                program[program[opPos + 3]] = 0
-            opPos += 4
-        elif opCode == 8:               # Equals
-            if fetch(program, opPos + 1, modes % 10) == fetch(program, opPos + 2, modes % 100 // 10):
-                program[program[opPos + 3]] = 1
-            else:
-                program[program[opPos + 3]] = 0
-            opPos += 4
-        elif opCode == 99:              # Break
-            print("Reached end instruction before returning any value... aborting")
-            return
-        else:
-            print("Unknown opcode... aborting.")
-            return
-
-# Executes the program with a given input vector
-def execute_pt2(program, opPos, inVec, outVec):
-    # Step through program
-    while True:
-        opCode = program[opPos] % 100   # Extract operand
-        modes = program[opPos] // 100   # Extract parameter modes
+#
+# Classes
+#
+class AmplifierChain:
+    """Chain of any number of amplifiers, each running its own copy of the program. Amplifier i reads its input from
+    queue i and writes its output to queue i+1. With feedback, the last amplifier writes back into the first queue and
+    the amplifiers take turns until they have all halted"""
+    def __init__(self, program: list, stages: int, feedback: bool = False) -> None:
+        # Parse the program once, and fork the amplifiers from it
+        self.computer = IntcodeComputer(program, ExecutionMode.CACHED)
+        self.stages = stages
+        self.feedback = feedback
+        self.chains = 0
+        self.cache = {}     # Output of a single amplifier in series, by (phase setting, input signal)
+        self.hits = 0
+        self.misses = 0
+
+    def run(self, phases: tuple) -> int:
+        """Runs the chain with the given phase settings and an input signal of 0. Returns the last signal of the last
+        amplifier"""
+        amps = [ self.computer.fork() for _ in phases ]
+        queues = [ deque([phase]) for phase in phases ]
+        queues[0].append(0)
+        queues.append(queues[0] if self.feedback else deque())
+        while True:
+            for amp, inbox, outbox in zip(amps, queues, queues[1:]):
+                amp.execute(lambda: inbox.popleft() if inbox else None, outbox.append)
+            # In series, every amplifier has had all its input after a single pass
+            if not self.feedback or amps[-1].has_completed(): break
+        self.chains += 1
+        return queues[-1][-1]
+
+    def run_stage(self, phase: int, signal: int) -> int:
+        """Output of a single amplifier in series. It only depends on the phase setting and the input signal, so it is
+        computed once for every combination"""
+        key = (phase, signal)
+        if key in self.cache:
+            self.hits += 1
+            return self.cache[key]
+        self.misses += 1
+        self.cache[key] = self.computer.fork().run([phase, signal])[0]
+        return self.cache[key]
+
+    def search(self, phase_set) -> tuple:
+        """Runs the chain for every ordering of phase settings taken from 'phase_set', and returns the highest signal
+        with the phase settings that produce it"""
+        if self.feedback: return max((self.run(phases), phases) for phases in permutations(phase_set, self.stages))
+
+        # In series, walk the orderings as a trie, so all orderings with the same prefix share the signal it produces
+        def walk(prefix: tuple, signal: int) -> tuple:
+            if len(prefix) == self.stages:
+                self.chains += 1
+                return signal, prefix
+            return max(walk(prefix + (phase,), self.run_stage(phase, signal))
+                       for phase in phase_set if phase not in prefix)
+        return walk((), 0)
 
-        if opCode == 1:                 # Addition
-            program[program[opPos + 3]] = fetch(program, opPos + 1, modes % 10) + fetch(program, opPos + 2, modes % 100 // 10)
-            opPos += 4
-        elif opCode == 2:               # Multiplication
-            program[program[opPos + 3]] = fetch(program, opPos + 1, modes % 10) * fetch(program, opPos + 2, modes % 100 // 10)
-            opPos += 4
-        elif opCode == 3:               # Input data from the input vector
-            program[program[opPos + 1]] = inVec.pop(0)
-            opPos += 2
-        elif opCode == 4:               # Push output data to the output vector and return
-            outVec.append(fetch(program, opPos + 1, modes % 10))
-            opPos += 2
-            return opPos
-        elif opCode == 5:               # Jump if true
-            if fetch(program, opPos + 1, modes % 10) != 0: opPos = fetch(program, opPos + 2, modes % 100 // 10)
-            else: opPos += 3
-        elif opCode == 6:               # Jump if false
-            if fetch(program, opPos + 1, modes % 10) == 0: opPos = fetch(program, opPos + 2, modes % 100 // 10)
-            else: opPos += 3
-        elif opCode == 7:               # Less than
-            if fetch(program, opPos + 1, modes % 10) < fetch(program, opPos + 2, modes % 100 // 10):
-                program[program[opPos + 3]] = 1
-            else:
-                program[program[opPos + 3]] = 0
-            opPos += 4
-        elif opCode == 8:               # Equals
-            if fetch(program, opPos + 1, modes % 10) == fetch(program, opPos + 2, modes % 100 // 10):
-                program[program[opPos + 3]] = 1
-            else:
-                program[program[opPos + 3]] = 0
-            opPos += 4
-        elif opCode == 99:              # Break
-            return -1
-        else:
-            print("Unknown opcode... aborting.")
-            exit
+#
+# Functions
+#
+# Searches the best phase settings, and reports the throughput of the search
+def search(program, stages, phase_set, feedback):
+    chain = AmplifierChain(program, stages, feedback)
+    start = time.perf_counter()
+    maxVal, _ = chain.search(phase_set)
+    duration = time.perf_counter() - start
+    print(f'{chain.chains} chains in {duration:.3f} s ({chain.chains / duration:,.0f} chains/s), '
+          f'amplifier cache: {chain.hits} hits, {chain.misses} misses')
+    return maxVal
 
 #
 # Process input
@@ -109,56 +86,9 @@ program = list(map(int, programText.split(',')))
 #
 # Puzzle 1
 #
-
-maxVal = 0
-
-# Try all phase settings
-for a in range(5):
-    aVal = execute_pt1(program.copy(), [a, 0])
-    for b in range(5):
-        bVal = execute_pt1(program.copy(), [b, aVal])
-        for c in range(5):
-            cVal = execute_pt1(program.copy(), [c, bVal])
-            for d in range(5):
-                dVal = execute_pt1(program.copy(), [d, cVal])
-                for e in range(5):
-                    eVal = execute_pt1(program.copy(), [e, dVal])
-
-                    # Check if no phase settings are used more than once and previous max is surpassed
-                    phases = [a, b, c, d, e]
-                    if len(dict.fromkeys(phases)) == 5 and eVal > maxVal:
-                        maxVal = eVal
-                        maxPhases = phases
-
-print(f'Puzzle 1 solution is: {maxVal}')
+print(f'Puzzle 1 solution is: {search(program, 5, range(5), False)}')
 
 #
 # Puzzle 2
 #
-maxVal = 0
-
-# Try all phase settings
-for a in range(5):
-    for b in range(5):
-        for c in range(5):
-            for d in range(5):
-                for e in range(5):
-                    # Check if no phase settings are used more than once
-                    phases = [a+5, b+5, c+5, d+5, e+5]
-                    if len(dict.fromkeys(phases)) == 5:
-                        inVec = [[a+5, 0], [b+5], [c+5], [d+5], [e+5]]  # Initialize input vector, incl first (0) signal
-                        opPoses = [0, 0, 0, 0, 0]                       # Initialize opPos vector
-                        # Initialize programs for all amps
-                        programs = [program.copy(), program.copy(), program.copy(), program.copy(), program.copy()]
-                        while opPoses[0] >= 0:
-                            for i in range(5):
-                                opPoses[i] = execute_pt2(programs[i], opPoses[i], inVec[i], inVec[(i+1) % 5])
-                            # Remember the input value to amp 0 (which is the same as the output value) from this iteration
-                            curVal = inVec[0][0]
-
-                        # Remember the vector if this is bigger than previous max
-                        if curVal > maxVal:
-                            maxVal = curVal
-                            maxPhases = phases
-
-print(f'Puzzle 2 solution is:{maxVal}')
\ No newline at end of file
+print(f'Puzzle 2 solution is: {search(program, 5, range(5, 10), True)}')
@@ -0,0 +1,12 @@
+from .computer import IntcodeComputer, ExecutionMode, Snapshot
+from .connection import Connection
+from .decode import DECODE_TABLE, OPERAND_COUNT
+from .memory import PagedMemory
+from .profiler import Profiler
+from .wire import Channel, RemoteConnection, serve
+from .symbolic import Affine, SymbolicError, execute_symbolic
+from .trace import TraceRecorder, TraceReplayer
+from .disasm import ControlFlowGraph, Instruction, BasicBlock
+from .checkpoint import save_checkpoint, load_checkpoint
+from .sweep import sweep, first_match
+from .introspect import MemoryView, Watcher
@@ -0,0 +1,14 @@
+import sys
+from .disasm import ControlFlowGraph
+
+#
+# Main function
+#
+if __name__ == "__main__":
+    # Usage: python -m intcode <program file> [listing|dot|json]
+    with open(sys.argv[1]) as file:
+        cfg = ControlFlowGraph(list(map(int, file.read().strip().split(','))))
+    match sys.argv[2] if len(sys.argv) > 2 else 'listing':
+        case 'dot': print(cfg.to_dot())
+        case 'json': print(cfg.to_json())
+        case _: print(cfg.listing())
@@ -0,0 +1,68 @@
+import mmap, os, struct, sys
+from array import array
+from .computer import IntcodeComputer, Snapshot
+from .memory import PagedMemory, PAGE_SIZE
+
+#
+# Constants
+#
+MAGIC = b'ICCKPT01'
+HEADER = struct.Struct('<8s8q')     # Magic, then instruction pointer, relative base, completed, image length, page
+                                    # count, input count, output count and length of the extra data
+
+#
+# Functions
+#
+def save_checkpoint(computer: IntcodeComputer, path: str, extra: bytes = b'') -> None:
+    """Save the complete state of 'computer' to a checkpoint file: instruction pointer, relative base, memory and
+    pending I/O, plus any 'extra' data of the host. After the header, all values are stored as one array of little
+    endian 64 bit integers (image, page numbers, pages, input queue, output queue), so load_checkpoint() can map them
+    on little endian hosts, and files can be moved between hosts"""
+    memory = computer.memory
+    page_nos = sorted(memory.pages)
+    values = array('q', memory.image)
+    values.extend(page_nos)
+    for page_no in page_nos: values.extend(memory.pages[page_no])
+    values.extend(computer.input_queue)
+    values.extend(computer.output_queue)
+    if sys.byteorder != 'little': values.byteswap()
+
+    # The file may still be mapped by a computer loaded from it, so it is replaced instead of overwritten in place
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, computer.instr_ptr, computer.rel_base, int(computer.completed),
+                               len(memory.image), len(page_nos), len(computer.input_queue),
+                               len(computer.output_queue), len(extra)))
+        values.tofile(file)
+        file.write(extra)
+    os.replace(temp_path, path)
+
+def load_checkpoint(computer: IntcodeComputer, path: str) -> bytes:
+    """Put 'computer' in the state saved in a checkpoint file, and return the extra data saved with it. The file is
+    memory mapped: pages are used in place until the computer writes to them, and only the program image (which the
+    execution loops need as a list) is copied out. Big endian hosts copy out all values, to swap their byte order.
+    Decode caches are rebuilt as the program runs. Raises ValueError if the file is not a complete checkpoint"""
+    with open(path, 'rb') as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(data) < HEADER.size: raise ValueError(f'{path} is truncated')
+    magic, ip, rb, completed, image_len, page_count, input_len, output_len, extra_len = HEADER.unpack_from(data)
+    if magic != MAGIC: raise ValueError(f'{path} is not an Intcode checkpoint')
+
+    count = image_len + page_count * (PAGE_SIZE + 1) + input_len + output_len
+    if len(data) != HEADER.size + 8 * count + extra_len: raise ValueError(f'{path} does not match its header')
+    values = memoryview(data)[HEADER.size:HEADER.size + 8 * count].cast('q')
+    if sys.byteorder != 'little':
+        values = array('q', values)
+        values.byteswap()
+    image = values[:image_len].tolist()
+    pos = image_len + page_count
+    page_nos = values[image_len:pos].tolist()
+    pages = { page_no: values[pos + i * PAGE_SIZE:pos + (i + 1) * PAGE_SIZE] for i, page_no in enumerate(page_nos) }
+    pos += page_count * PAGE_SIZE
+    inputs = tuple(values[pos:pos + input_len])
+    outputs = tuple(values[pos + input_len:pos + input_len + output_len])
+    extra = bytes(data[HEADER.size + 8 * count:HEADER.size + 8 * count + extra_len])
+
+    caches = ([], bytearray(), {}, {}, set())
+    computer.load(Snapshot(PagedMemory(image, pages), ip, rb, bool(completed), inputs, outputs, caches))
+    return extra
@@ -0,0 +1,94 @@
+from .decode import DECODE_TABLE, OPERAND_COUNT, WRITE_OPERAND
+from .memory import VOID
+
+#
+# Constants
+#
+MAX_BLOCK_LENGTH = 64   # Maximum number of instructions compiled into one block
+OUT_OF_IMAGE = -1       # Dirty address returned by a block that stopped at an access beyond the program image
+
+#
+# Functions
+#
+def read_operand(mode: int, param: int) -> str:
+    """Python expression reading an operand, with immediates and position mode addresses folded into the code"""
+    match mode:
+        case 0: return f'mem[{param}]'                                  # Position mode
+        case 1: return f'{param}'                                       # Immediate mode
+        case 2: return f'mem[x if (x := rb + {param}) >= 0 else VOID]'  # Relative mode, negative addresses are VOID
+
+def write_address(mode: int, param: int, pos: int) -> str:
+    """Python expression for the address an instruction writes to. 'pos' is the address of the parameter itself"""
+    match mode:
+        case 0: return f'{param}'                                       # Position mode
+        case 1: return f'{pos}'                                         # Immediate mode writes to the parameter itself
+        case 2: return f'x if (x := rb + {param}) >= 0 else VOID'       # Relative mode, negative addresses are VOID
+
+def find_block(program: list, pos: int) -> list:
+    """Decode the straight line basic block starting at 'pos' as a list of (address, op code, modes, parameters). The
+    block ends with (and includes) the first jump, or ends before the first I/O or halt instruction. It also ends
+    before any instruction with a position mode address outside of 'program', which is left to the interpreter"""
+    block = []
+    while len(block) < MAX_BLOCK_LENGTH and pos < len(program):
+        decoded = DECODE_TABLE.get(program[pos])
+        if decoded is None: break
+        op_code, *modes = decoded
+        if op_code in (3, 4, 99): break
+        length = OPERAND_COUNT[op_code] + 1
+        if pos + length > len(program): break
+        if any(modes[i] == 0 and not 0 <= program[pos + i + 1] < len(program) for i in range(length - 1)): break
+        block.append((pos, op_code, modes, program[pos+1:pos+length]))
+        pos += length
+        if op_code in (5, 6): break
+    return block
+
+def compile_block(program: list, pos: int, code_cells: bytearray | None = None) -> tuple:
+    """Compile the basic block starting at 'pos' into a Python function. Returns the function and the range of
+    addresses its code was compiled from, or (None, empty range) when the block is empty.
+
+    The function takes (mem, rb, code_map) and returns (next instruction pointer, relative base, dirty address,
+    number of instructions executed). If an instruction writes into a cell marked in 'code_map', the block returns
+    right after that instruction with the written address as the dirty address, so the host can invalidate compiled
+    code before it runs again. If a relative mode access is negative or falls outside of 'mem', the block returns at
+    that instruction with OUT_OF_IMAGE as the dirty address, and none of the instruction's effects applied.
+
+    If 'code_cells' marks the cells that static analysis found to be code, position mode writes to any other cell are
+    compiled without the 'code_map' check"""
+    block = find_block(program, pos)
+    if len(block) == 0: return None, range(pos, pos)
+
+    # Only blocks with relative mode operands can reach beyond the program image at run time
+    guarded = any(2 in modes[:len(params)] for _, _, modes, params in block)
+    indent = ' ' * (8 if guarded else 4)
+    lines = [f'def block_{pos}(mem, rb, code_map):']
+    if guarded: lines.append('    try:')
+    for done, (addr, op_code, modes, params) in enumerate(block):
+        next_ip = addr + len(params) + 1
+        if 2 in modes[:len(params)]: lines.append(f'{indent}at, done = {addr}, {done}')
+        a, b = (read_operand(modes[i], params[i]) if i < len(params) else None for i in range(2))
+        match op_code:
+            case 1: expr = f'{a} + {b}'                     # Addition
+            case 2: expr = f'{a} * {b}'                     # Multiplication
+            case 7: expr = f'1 if {a} < {b} else 0'         # Less than
+            case 8: expr = f'1 if {a} == {b} else 0'        # Equals
+            case 5:                                         # Jump if true
+                lines.append(f'{indent}return ({b} if {a} != 0 else {next_ip}), rb, None, {done + 1}')
+                break
+            case 6:                                         # Jump if false
+                lines.append(f'{indent}return ({b} if {a} == 0 else {next_ip}), rb, None, {done + 1}')
+                break
+            case 9:                                         # Change relative base
+                lines.append(f'{indent}rb += {a}')
+                continue
+        i = WRITE_OPERAND[op_code]
+        lines.append(f'{indent}addr = {write_address(modes[i], params[i], addr + i + 1)}')
+        lines.append(f'{indent}mem[addr] = {expr}')
+        if code_cells is None or modes[i] != 0 or params[i] >= len(code_cells) or code_cells[params[i]]:
+            lines.append(f'{indent}if code_map[addr]: return {next_ip}, rb, addr, {done + 1}')
+    else:
+        lines.append(f'{indent}return {next_ip}, rb, None, {len(block)}')
+    if guarded: lines.append('    except IndexError: return at, rb, OUT_OF_IMAGE, done')
+
+    namespace = { 'OUT_OF_IMAGE': OUT_OF_IMAGE, 'VOID': VOID }
+    exec(compile('\n'.join(lines), f'<intcode block {pos}>', 'exec'), namespace)
+    return namespace[f'block_{pos}'], range(pos, next_ip)
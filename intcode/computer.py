@@ -0,0 +1,693 @@
+import copy, sys
+from collections import deque
+from typing import Callable, Generator
+from .decode import DECODE_TABLE, OPERAND_COUNT, WRITE_OPERAND, FUSED_MOVE, FUSED_ARB_JUMP
+from .compiler import compile_block, OUT_OF_IMAGE
+from .disasm import ControlFlowGraph
+from .introspect import MemoryView, Watcher, find
+from .memory import PagedMemory, VOID
+from .profiler import environment_profiler
+
+#
+# Constants
+#
+MAX_RECORD_LENGTH = 7   # Number of cells covered by the longest decoded record, a fused compare and branch
+
+#
+# Functions
+#
+def default_recv() -> int:
+    """Read input for the computer from STDIN"""
+    return int(input('Input: '))
+
+#
+# Classes
+#
+class ExecutionMode:
+    """Lists the available ways for the computer to execute a program"""
+    INTERPRETED = 0     # Decode every instruction when it is executed
+    CACHED = 1          # Decode every address once into an instruction record, and reuse the record on later visits
+    COMPILED = 2        # Compile straight line basic blocks into Python functions, and dispatch per block
+
+class Snapshot:
+    """Complete state of an Intcode computer: memory, instruction pointer, relative base, pending I/O and decode caches.
+    The memory is a copy-on-write fork, so taking a snapshot only costs what the computer writes afterwards"""
+    def __init__(self, memory: PagedMemory, instr_ptr: int, rel_base: int, completed: bool, input_queue: tuple,
+                 output_queue: tuple, caches: tuple) -> None:
+        self.memory = memory
+        self.instr_ptr = instr_ptr
+        self.rel_base = rel_base
+        self.completed = completed
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.caches = caches
+
+class IntcodeComputer:
+    """Shared Intcode computer. Execution is resumable, so the host can pause it to wait for input and continue it later"""
+    def __init__(self, program: str | list, mode: int = ExecutionMode.INTERPRETED) -> None:
+        if isinstance(program, str): program = map(int, program.split(','))
+        self.initial_program = list(program)
+        self.memory = PagedMemory(self.initial_program.copy())
+        self.instr_ptr = 0
+        self.rel_base = 0
+        self.completed = False
+        self.input_queue = deque()
+        self.output_queue = []
+        self.running = False
+        self.mode = mode
+        self.profiler = environment_profiler()
+        self.recorder = None
+        self.watcher = None
+        self.trusted_code = None
+        self.instructions = 0       # Instructions executed so far, in any execution mode
+        self.clear_decoded()
+
+    @property
+    def program(self) -> list:
+        """The dense program image part of the memory"""
+        return self.memory.image
+
+    def snapshot(self) -> Snapshot:
+        """Capture the complete state of the computer"""
+        # While executing, the loops update the image and the decode caches in place, so they can't be shared with the
+        # snapshot. Otherwise, both sides share the caches until either one updates them
+        caches = (self.decoded, self.code_map, self.blocks, self.block_cells, self.volatile_blocks)
+        if self.running: caches = tuple(cache.copy() for cache in caches)
+        else: self.caches_shared = True
+        return Snapshot(self.memory.fork(share_image=not self.running), self.instr_ptr, self.rel_base, self.completed,
+                        tuple(self.input_queue), tuple(self.output_queue), caches)
+
+    def load(self, snapshot: Snapshot) -> None:
+        """Put the computer in the state captured by 'snapshot'. The snapshot can be loaded again later"""
+        self.memory = snapshot.memory.fork()
+        self.instr_ptr = snapshot.instr_ptr
+        self.rel_base = snapshot.rel_base
+        self.completed = snapshot.completed
+        self.input_queue = deque(snapshot.input_queue)
+        self.output_queue = list(snapshot.output_queue)
+        self.decoded, self.code_map, self.blocks, self.block_cells, self.volatile_blocks = snapshot.caches
+        self.caches_shared = True
+
+    def fork(self) -> 'IntcodeComputer':
+        """Create a new computer in the exact state of this one. Both share their memory pages until they write to them.
+        The child shares the profiler and inherits a copy of the watchpoints, which it can change on its own, but it
+        isn't recorded: a trace follows a single computer"""
+        child = copy.copy(self)
+        child.running = False
+        child.recorder = None
+        if self.watcher is not None: child.watcher = self.watcher.copy()
+        child.load(self.snapshot())
+        return child
+
+    def backup(self) -> None:
+        """Backup the complete state of the computer"""
+        self.state_backup = self.snapshot()
+
+    def restore(self) -> None:
+        """Restore the state saved by the latest backup()"""
+        self.load(self.state_backup)
+
+    def reset(self) -> None:
+        """Reset the computer to the program it was created with"""
+        self.memory = PagedMemory(self.initial_program.copy())
+        self.instr_ptr = 0
+        self.rel_base = 0
+        self.completed = False
+        self.input_queue = deque()
+        self.output_queue = []
+        self.clear_decoded()
+
+    def has_completed(self) -> bool:
+        return self.completed
+
+    def read(self, pos: int) -> int:
+        """Read the value at address 'pos'"""
+        return self.memory[pos]
+
+    def write(self, pos: int, val: int) -> None:
+        """Write 'val' to address 'pos', e.g. to patch the program before running it"""
+        self.memory[pos] = val
+        if pos < len(self.code_map) and self.code_map[pos]: self.invalidate(pos)
+
+    def view(self, start: int, length: int, fields: tuple | None = None) -> MemoryView:
+        """Live view of 'length' cells from address 'start', or of 'length' records of 'fields' cells each"""
+        return MemoryView(self, start, length, fields)
+
+    def find(self, pattern: list, start: int = 0, end: int | None = None) -> list:
+        """Addresses where the values of 'pattern' occur in memory, with None matching any value"""
+        return find(self, pattern, start, end)
+
+    def watch(self, start: int, end: int, callback: Callable[['IntcodeComputer', int, int, int], bool | None]) -> None:
+        """Call callback(computer, address, old value, new value) on every write to an address from 'start' up to 'end'.
+        Watching makes the computer single-step until the watcher is detached again (watcher = None)"""
+        if self.watcher is None: self.watcher = Watcher()
+        self.watcher.watch(start, end, callback)
+
+    def fetch(self, pos: int, param_mode: int, rel_base: int) -> int:
+        """Fetches a value from the program at position 'pos' using parameter mode 'mode'"""
+        match param_mode:
+            case 0: return self.memory[self.memory[pos]]                # Position mode
+            case 1: return self.memory[pos]                             # Absolute mode
+            case 2: return self.memory[rel_base + self.memory[pos]]     # Relative mode
+
+    def stor(self, pos: int, param_mode: int, rel_base: int, val: int) -> None:
+        """Stores a value in the program at position 'pos' using parameter mode 'mode'"""
+        match param_mode:
+            case 0: self.write(self.memory[pos], val)                   # Position mode
+            case 1: self.write(pos, val)                                # Absolute mode
+            case 2: self.write(rel_base + self.memory[pos], val)        # Relative mode
+
+    def clear_decoded(self) -> None:
+        """Forget all decoded instruction records, e.g. when the program memory has been replaced"""
+        self.decoded = []
+        self.code_map = bytearray()
+        self.blocks = {}
+        self.block_cells = {}
+        self.volatile_blocks = set()
+        self.caches_shared = False
+
+    def own_caches(self) -> None:
+        """Make sure the decode caches are not shared with any snapshot, so they can be updated in place. As with the
+        image, they are taken over as they are if nothing else refers to them anymore"""
+        if self.caches_shared and sys.getrefcount(self.decoded) <= 2: self.caches_shared = False    # Only this computer
+        if self.caches_shared:
+            self.decoded = self.decoded.copy()
+            self.code_map = self.code_map.copy()
+            self.blocks = self.blocks.copy()
+            self.block_cells = self.block_cells.copy()
+            self.volatile_blocks = self.volatile_blocks.copy()
+            self.caches_shared = False
+
+    def fit_decoded(self) -> None:
+        """Grow the decode caches to cover the whole program image, after it has grown or been replaced. The execution
+        loops call this before they take the caches, so it also makes sure they own them"""
+        self.own_caches()
+        missing = len(self.program) - len(self.code_map)
+        if missing <= 0: return
+        self.code_map.extend(bytes(missing))
+        self.decoded.extend([None] * missing)
+
+        # Instructions addressing cells beyond the old image were left to the interpreter, so let them compile again
+        for pos in [ pos for pos, block in self.blocks.items() if block is None ]: del self.blocks[pos]
+
+    def decode(self, pos: int) -> tuple | None:
+        """Decode the instruction at 'pos' into a record of (op code, mode 1, parameter 1, mode 2, parameter 2, mode 3,
+        parameter 3, next instruction pointer) and cache it. Parameters in mode 1 are immediates, otherwise addresses
+        or relative base offsets. Common pairs of instructions are fused into one superinstruction record (see fuse).
+        Returns None for an unknown op code"""
+        record = self.decode_record(pos)
+        if record is None: return None
+        self.own_caches()
+        record = self.fuse(record) or record
+
+        self.decoded[pos] = record
+        end = record[7] if type(record[7]) is int else record[7][0]
+        self.code_map[pos:end] = b'\x01' * (end - pos)
+        return record
+
+    def decode_record(self, pos: int) -> tuple | None:
+        """Decode the single instruction at 'pos' into a record, without caching it"""
+        try: op_code, *modes = DECODE_TABLE[self.program[pos]]
+        except KeyError: return None
+
+        length = OPERAND_COUNT[op_code] + 1
+        params = [ self.memory[pos + i + 1] for i in range(length - 1) ] + [0] * (4 - length)
+        record = [op_code]
+        for i in range(3):
+            if modes[i] == 1 and WRITE_OPERAND.get(op_code) == i:
+                record += [0, pos + i + 1]      # Immediate mode writes go to the parameter itself
+            else: record += [modes[i], params[i]]
+        return (*record, pos + length)
+
+    def fuse(self, record: tuple) -> tuple | None:
+        """Superinstruction record for the instruction in 'record' together with the one following it, or None if they
+        don't form a known idiom. Fused records span both instructions, so a write into either one invalidates them.
+        For compare and branch, the last field holds the fall through address and the jump target"""
+        op_code, m1, p1, m2, p2, m3, p3, next_ip = record
+        match op_code:
+            case 1 | 2:     # Moves: addition of 0, multiplication by 1
+                neutral = op_code - 1
+                if m2 == 1 and p2 == neutral: return (FUSED_MOVE, m1, p1, 0, 0, m3, p3, next_ip)
+                if m1 == 1 and p1 == neutral: return (FUSED_MOVE, m2, p2, 0, 0, m3, p3, next_ip)
+                return None
+            case 7 | 8 | 9:
+                if next_ip >= len(self.program): return None
+                following = self.decode_record(next_ip)
+                if following is None or following[0] not in (5, 6): return None
+                jump, j1, q1, j2, q2, _, _, fall = following
+                if op_code == 9:
+                    # Only unconditional jumps, so a return goes through a single dispatch
+                    if j1 == 1 and (q1 != 0) == (jump == 5): return (FUSED_ARB_JUMP, m1, p1, j2, q2, 0, 0, fall)
+                    return None
+                # Branching on the comparison result, to an immediate target
+                if j1 == m3 and q1 == p3 and j2 == 1:
+                    return (10 * op_code + jump, m1, p1, m2, p2, m3, p3, (fall, q2))
+        return None
+
+    def analyse(self) -> ControlFlowGraph:
+        """Statically analyse the program, and let compiled blocks skip the self-modification check for position mode
+        writes to cells the analysis found to be data. Returns the control flow graph"""
+        cfg = ControlFlowGraph(self.program)
+        self.own_caches()
+        self.trusted_code = cfg.code_cells
+        self.blocks.clear()
+        self.block_cells.clear()
+        return cfg
+
+    def compile(self, pos: int):
+        """Compile the basic block starting at 'pos' and cache it. Returns (and caches) None if the instruction at 'pos'
+        has to be interpreted, i.e. for I/O and halt instructions, and for blocks that have been overwritten before"""
+        self.own_caches()
+        trusted = self.trusted_code
+        block, cells = (None, None) if pos in self.volatile_blocks else compile_block(self.program, pos, trusted)
+        if block is not None and trusted is not None and not all(cell < len(trusted) and trusted[cell] for cell in cells):
+            # Execution reached code the analysis missed, so blocks compiled on the strength of it can't be trusted
+            self.trusted_code = None
+            self.blocks.clear()
+            self.block_cells.clear()
+            block, cells = compile_block(self.program, pos)
+        self.blocks[pos] = block
+        if block is None: return None
+
+        self.code_map[cells.start:cells.stop] = b'\x01' * len(cells)
+        for cell in cells: self.block_cells[cell] = self.block_cells.get(cell, ()) + (pos,)
+        return block
+
+    def invalidate(self, pos: int) -> None:
+        """Drop the cached records and compiled blocks of all decoded instructions that cover address 'pos'"""
+        self.own_caches()
+        for start in range(max(pos - MAX_RECORD_LENGTH + 1, 0), min(pos + 1, len(self.decoded))):
+            record = self.decoded[start]
+            if record is None: continue
+            end = record[7] if type(record[7]) is int else record[7][0]
+            if end > pos: self.decoded[start] = None
+
+        # Blocks that have been overwritten are left to the interpreter from now on
+        for start in self.block_cells.pop(pos, ()):
+            if self.blocks.pop(start, None) is not None: self.volatile_blocks.add(start)
+
+    def recv_queued(self) -> int | None:
+        """Take the next value from the input queue, or None if it is empty"""
+        return self.input_queue.popleft() if self.input_queue else None
+
+    def run(self, inputs: list = ()) -> list:
+        """Feed 'inputs' to the program and return all outputs produced until it halts or waits for more input"""
+        self.input_queue.extend(inputs)
+        self.execute(self.recv_queued, self.output_queue.append)
+        outputs = self.output_queue
+        self.output_queue = []
+        return outputs
+
+    def coroutine(self) -> Generator[list, int | list | None, None]:
+        """Run the computer as a generator. The first next() runs it until it waits for input, after that every value
+        (or list of values) sent is queued as input. Every yield hands back the outputs produced until the program
+        waits for input again or halts, and the generator stops when the program has halted"""
+        outputs = self.run()
+        while True:
+            inputs = yield outputs
+            if self.completed: return
+            outputs = self.run([inputs] if isinstance(inputs, int) else inputs or ())
+
+    def execute(self, recv: Callable[[], int | None] = default_recv, send: Callable[[int], bool | None] = print) -> None:
+        """Executes the program from the current instruction pointer. Returns when the program halts, when 'recv'
+        returns None (no input available yet) or when 'send' returns True (host wants control back after an output)"""
+        self.running = True
+        try:
+            hooks = self.hooks()
+            if hooks:
+                self.execute_instrumented(hooks, recv, send)
+                return
+
+            # The execution loops write to the image in place, so they need one that isn't shared with any fork. A fork
+            # only takes its own copy when it writes, so it runs through step() up to its first write
+            while self.memory.image_shared:
+                op_code = DECODE_TABLE.get(self.memory[self.instr_ptr], (None,))[0]
+                if self.step(recv, send): return
+                if op_code in WRITE_OPERAND: break
+            self.memory.own_image()
+            match self.mode:
+                case ExecutionMode.INTERPRETED: self.execute_interpreted(recv, send)
+                case ExecutionMode.CACHED: self.execute_cached(recv, send)
+                case ExecutionMode.COMPILED: self.execute_compiled(recv, send)
+        finally:
+            self.running = False
+
+    def hooks(self) -> list:
+        """The attached instrumentation (profiler, trace recorder and watcher), in the order it sees instructions"""
+        return [ hook for hook in (self.profiler, self.recorder, self.watcher) if hook is not None ]
+
+    def execute_instrumented(self, hooks: list, recv: Callable[[], int | None],
+                             send: Callable[[int], bool | None]) -> None:
+        """Executes the program one instruction at a time, whatever the execution mode, and reports every instruction
+        to all of the 'hooks'. A hook has three methods: start(computer) is called when execution starts,
+        instruction(computer, address, op code, written address, old value, output) right after every instruction,
+        and stop(computer, waiting) when execution stops, with 'waiting' telling whether it stopped to wait for input.
+        The written address, its old value and the output are None for instructions that don't write or output. An
+        instruction hook returning True pauses the computer, like 'send' does"""
+        output = None
+        def hooked_send(val: int) -> bool | None:
+            nonlocal output
+            output = val
+            return send(val)
+
+        waiting = False
+        for hook in hooks: hook.start(self)
+        try:
+            while True:
+                ip = self.instr_ptr
+                op_code, *modes = DECODE_TABLE.get(self.memory[ip], (None, 0, 0, 0))
+                addr = old = output = None
+                if op_code in WRITE_OPERAND:
+                    # The write may overwrite its own parameter, so the address has to be resolved up front
+                    i = WRITE_OPERAND[op_code]
+                    addr = ip + i + 1 if modes[i] == 1 else self.memory[ip + i + 1]
+                    if modes[i] == 2: addr += self.rel_base
+                    old = self.memory[addr]
+                stop = self.step(recv, hooked_send)
+
+                # Nothing was executed if the program stopped without moving on, i.e. when it waits for input
+                if stop and self.instr_ptr == ip and not self.completed:
+                    waiting = op_code == 3
+                    break
+                pauses = [ hook.instruction(self, ip, op_code, addr, old, output) for hook in hooks ]
+                if stop or any(pauses): break
+        finally:
+            for hook in hooks: hook.stop(self, waiting)
+
+    def step(self, recv: Callable[[], int | None], send: Callable[[int], bool | None]) -> bool:
+        """Executes a single instruction. Returns True when control should go back to the host, i.e. when the program
+        has halted, is waiting for input or 'send' asked for a pause"""
+        ip = self.instr_ptr
+        rb = self.rel_base
+        try: op_code, m1, m2, m3 = DECODE_TABLE[self.memory[ip]]
+        except KeyError:
+            print(f'Error: Unknown opcode {self.memory[ip] % 100}... aborting.')
+            return True
+
+        match op_code:
+            case 1:     # Addition
+                self.stor(ip + 3, m3, rb, self.fetch(ip + 1, m1, rb) + self.fetch(ip + 2, m2, rb))
+                self.instr_ptr += 4
+            case 2:     # Multiplication
+                self.stor(ip + 3, m3, rb, self.fetch(ip + 1, m1, rb) * self.fetch(ip + 2, m2, rb))
+                self.instr_ptr += 4
+            case 3:     # Input data
+                val = recv()
+                if val is None: return True     # Return control to the host to await new input
+                self.stor(ip + 1, m1, rb, val)
+                self.instr_ptr += 2
+            case 4:     # Output data
+                val = self.fetch(ip + 1, m1, rb)
+                self.instr_ptr += 2
+                self.instructions += 1
+                return bool(send(val))
+            case 5:     # Jump if true
+                if self.fetch(ip + 1, m1, rb) != 0: self.instr_ptr = self.fetch(ip + 2, m2, rb)
+                else: self.instr_ptr += 3
+            case 6:     # Jump if false
+                if self.fetch(ip + 1, m1, rb) == 0: self.instr_ptr = self.fetch(ip + 2, m2, rb)
+                else: self.instr_ptr += 3
+            case 7:     # Less than
+                self.stor(ip + 3, m3, rb, 1 if self.fetch(ip + 1, m1, rb) < self.fetch(ip + 2, m2, rb) else 0)
+                self.instr_ptr += 4
+            case 8:     # Equals
+                self.stor(ip + 3, m3, rb, 1 if self.fetch(ip + 1, m1, rb) == self.fetch(ip + 2, m2, rb) else 0)
+                self.instr_ptr += 4
+            case 9:     # Change relative base
+                self.rel_base += self.fetch(ip + 1, m1, rb)
+                self.instr_ptr += 2
+            case 99:    # Break
+                self.completed = True
+                self.instructions += 1
+                return True
+        self.instructions += 1
+        return False
+
+    def execute_interpreted(self, recv: Callable[[], int | None], send: Callable[[int], bool | None]) -> None:
+        """Executes the program, decoding every instruction through the decode table when it is executed"""
+        mem = self.program
+        decode = DECODE_TABLE
+        ip = self.instr_ptr
+        rb = self.rel_base
+        executed = self.instructions
+        in_callback = False     # Set while recv or send runs, so an IndexError they raise is passed on to the host
+
+        # The instruction pointer and relative base are written back before recv and send, so the callbacks can
+        # snapshot or fork the computer. Instructions are counted as they start, so the count is corrected for
+        # instructions that don't complete
+
+        # Operands are resolved inline: mode 1 is immediate, otherwise the parameter is an address, offset by
+        # the relative base in mode 2. Negative addresses are replaced by VOID, so step() raises the error for them
+        while True:
+            try:
+                while True:
+                    try: op_code, m1, m2, m3 = decode[mem[ip]]
+                    except KeyError:
+                        print(f'Error: Unknown opcode {mem[ip] % 100}... aborting.')
+                        break
+                    executed += 1
+
+                    match op_code:
+                        case 1:     # Addition
+                            a = mem[ip+1] if m1 == 1 else mem[x if (x := mem[ip+1] + (rb if m1 else 0)) >= 0 else VOID]
+                            b = mem[ip+2] if m2 == 1 else mem[x if (x := mem[ip+2] + (rb if m2 else 0)) >= 0 else VOID]
+                            addr = ip+3 if m3 == 1 else x if (x := mem[ip+3] + (rb if m3 else 0)) >= 0 else VOID
+                            mem[addr] = a + b
+                            ip += 4
+                        case 2:     # Multiplication
+                            a = mem[ip+1] if m1 == 1 else mem[x if (x := mem[ip+1] + (rb if m1 else 0)) >= 0 else VOID]
+                            b = mem[ip+2] if m2 == 1 else mem[x if (x := mem[ip+2] + (rb if m2 else 0)) >= 0 else VOID]
+                            addr = ip+3 if m3 == 1 else x if (x := mem[ip+3] + (rb if m3 else 0)) >= 0 else VOID
+                            mem[addr] = a * b
+                            ip += 4
+                        case 3:     # Input data
+                            addr = ip+1 if m1 == 1 else x if (x := mem[ip+1] + (rb if m1 else 0)) >= 0 else VOID
+                            mem[addr]   # Make sure the address is in the program image before consuming input
+                            self.instr_ptr, self.rel_base = ip, rb
+                            in_callback = True
+                            val = recv()
+                            in_callback = False
+                            if val is None:         # Return control to the host to await new input
+                                executed -= 1
+                                break
+                            mem[addr] = val
+                            ip += 2
+                        case 4:     # Output data
+                            a = mem[ip+1] if m1 == 1 else mem[x if (x := mem[ip+1] + (rb if m1 else 0)) >= 0 else VOID]
+                            ip += 2
+                            self.instr_ptr, self.rel_base = ip, rb
+                            in_callback = True
+                            pause = send(a)
+                            in_callback = False
+                            if pause: break
+                        case 5:     # Jump if true
+                            a = mem[ip+1] if m1 == 1 else mem[x if (x := mem[ip+1] + (rb if m1 else 0)) >= 0 else VOID]
+                            b = mem[ip+2] if m2 == 1 else mem[x if (x := mem[ip+2] + (rb if m2 else 0)) >= 0 else VOID]
+                            ip = b if a != 0 else ip + 3
+                        case 6:     # Jump if false
+                            a = mem[ip+1] if m1 == 1 else mem[x if (x := mem[ip+1] + (rb if m1 else 0)) >= 0 else VOID]
+                            b = mem[ip+2] if m2 == 1 else mem[x if (x := mem[ip+2] + (rb if m2 else 0)) >= 0 else VOID]
+                            ip = b if a == 0 else ip + 3
+                        case 7:     # Less than
+                            a = mem[ip+1] if m1 == 1 else mem[x if (x := mem[ip+1] + (rb if m1 else 0)) >= 0 else VOID]
+                            b = mem[ip+2] if m2 == 1 else mem[x if (x := mem[ip+2] + (rb if m2 else 0)) >= 0 else VOID]
+                            addr = ip+3 if m3 == 1 else x if (x := mem[ip+3] + (rb if m3 else 0)) >= 0 else VOID
+                            mem[addr] = 1 if a < b else 0
+                            ip += 4
+                        case 8:     # Equals
+                            a = mem[ip+1] if m1 == 1 else mem[x if (x := mem[ip+1] + (rb if m1 else 0)) >= 0 else VOID]
+                            b = mem[ip+2] if m2 == 1 else mem[x if (x := mem[ip+2] + (rb if m2 else 0)) >= 0 else VOID]
+                            addr = ip+3 if m3 == 1 else x if (x := mem[ip+3] + (rb if m3 else 0)) >= 0 else VOID
+                            mem[addr] = 1 if a == b else 0
+                            ip += 4
+                        case 9:     # Change relative base
+                            a = mem[ip+1] if m1 == 1 else mem[x if (x := mem[ip+1] + (rb if m1 else 0)) >= 0 else VOID]
+                            rb += a
+                            ip += 2
+                        case 99:    # Break
+                            self.completed = True
+                            break
+                break
+            except IndexError:
+                self.instr_ptr = ip
+                self.rel_base = rb
+                self.instructions = executed if in_callback else executed - 1
+                if in_callback: raise   # Errors of the host's callbacks are not the program's to handle
+
+                # The instruction reaches beyond the program image, so step() runs it on the paged memory
+                if self.step(recv, send): return
+                ip = self.instr_ptr
+                rb = self.rel_base
+                executed = self.instructions
+
+        self.instr_ptr = ip
+        self.rel_base = rb
+        self.instructions = executed
+
+    def execute_cached(self, recv: Callable[[], int | None], send: Callable[[int], bool | None]) -> None:
+        """Executes the program, decoding every address once into an instruction record. Writes into decoded
+        instructions invalidate their records, so self-modifying programs are decoded again"""
+        mem = self.program
+        self.fit_decoded()
+        decoded = self.decoded
+        code_map = self.code_map
+        ip = self.instr_ptr
+        rb = self.rel_base
+        executed = self.instructions
+        in_callback = False     # Set while recv or send runs, so an IndexError they raise is passed on to the host
+
+        # The instruction pointer and relative base are written back before recv and send, so the callbacks can
+        # snapshot or fork the computer. Records are counted as one instruction as they start, fused records count
+        # their second instruction once it is done
+
+        # Store parameters are never immediates in a record, so they are resolved the same way as position mode reads.
+        # Negative addresses are replaced by VOID, so step() raises the error for them. The match arms are tried in
+        # order, so they are ordered by how often they typically run
+        while True:
+            try:
+                while True:
+                    record = decoded[ip] or self.decode(ip)
+                    if record is None:
+                        print(f'Error: Unknown opcode {mem[ip] % 100}... aborting.')
+                        break
+                    op_code, m1, p1, m2, p2, m3, p3, next_ip = record
+                    executed += 1
+
+                    match op_code:
+                        case 10:    # Move (fused 'add x, 0' / 'mul x, 1')
+                            addr = x if (x := p3 + (rb if m3 else 0)) >= 0 else VOID
+                            mem[addr] = p1 if m1 == 1 else mem[x if (x := p1 + (rb if m1 else 0)) >= 0 else VOID]
+                            if code_map[addr]: self.invalidate(addr)
+                            ip = next_ip
+                        case 1:     # Addition
+                            a = p1 if m1 == 1 else mem[x if (x := p1 + (rb if m1 else 0)) >= 0 else VOID]
+                            b = p2 if m2 == 1 else mem[x if (x := p2 + (rb if m2 else 0)) >= 0 else VOID]
+                            addr = x if (x := p3 + (rb if m3 else 0)) >= 0 else VOID
+                            mem[addr] = a + b
+                            if code_map[addr]: self.invalidate(addr)
+                            ip = next_ip
+                        case 9:     # Change relative base
+                            rb += p1 if m1 == 1 else mem[x if (x := p1 + (rb if m1 else 0)) >= 0 else VOID]
+                            ip = next_ip
+                        case 75 | 76 | 85 | 86:     # Compare and branch on the result (fused 'lt'/'eq' and 'jt'/'jf')
+                            a = p1 if m1 == 1 else mem[x if (x := p1 + (rb if m1 else 0)) >= 0 else VOID]
+                            b = p2 if m2 == 1 else mem[x if (x := p2 + (rb if m2 else 0)) >= 0 else VOID]
+                            cond = a < b if op_code < 80 else a == b
+                            addr = x if (x := p3 + (rb if m3 else 0)) >= 0 else VOID
+                            mem[addr] = 1 if cond else 0
+                            if code_map[addr]:
+                                # The write may have changed the jump, so that is decoded again on its own
+                                self.invalidate(addr)
+                                ip += 4
+                                continue
+                            fall, target = next_ip
+                            ip = target if cond == (op_code & 1) else fall
+                            executed += 1
+                        case 91:    # Change relative base and jump (fused 'arb' and an unconditional 'jt'/'jf')
+                            # The new base is only committed once the jump target has been read
+                            new_rb = rb + (p1 if m1 == 1 else mem[x if (x := p1 + (rb if m1 else 0)) >= 0 else VOID])
+                            ip = p2 if m2 == 1 else mem[x if (x := p2 + (new_rb if m2 else 0)) >= 0 else VOID]
+                            rb = new_rb
+                            executed += 1
+                        case 5:     # Jump if true
+                            a = p1 if m1 == 1 else mem[x if (x := p1 + (rb if m1 else 0)) >= 0 else VOID]
+                            if a != 0: ip = p2 if m2 == 1 else mem[x if (x := p2 + (rb if m2 else 0)) >= 0 else VOID]
+                            else: ip = next_ip
+                        case 6:     # Jump if false
+                            a = p1 if m1 == 1 else mem[x if (x := p1 + (rb if m1 else 0)) >= 0 else VOID]
+                            if a == 0: ip = p2 if m2 == 1 else mem[x if (x := p2 + (rb if m2 else 0)) >= 0 else VOID]
+                            else: ip = next_ip
+                        case 2:     # Multiplication
+                            a = p1 if m1 == 1 else mem[x if (x := p1 + (rb if m1 else 0)) >= 0 else VOID]
+                            b = p2 if m2 == 1 else mem[x if (x := p2 + (rb if m2 else 0)) >= 0 else VOID]
+                            addr = x if (x := p3 + (rb if m3 else 0)) >= 0 else VOID
+                            mem[addr] = a * b
+                            if code_map[addr]: self.invalidate(addr)
+                            ip = next_ip
+                        case 7:     # Less than
+                            a = p1 if m1 == 1 else mem[x if (x := p1 + (rb if m1 else 0)) >= 0 else VOID]
+                            b = p2 if m2 == 1 else mem[x if (x := p2 + (rb if m2 else 0)) >= 0 else VOID]
+                            addr = x if (x := p3 + (rb if m3 else 0)) >= 0 else VOID
+                            mem[addr] = 1 if a < b else 0
+                            if code_map[addr]: self.invalidate(addr)
+                            ip = next_ip
+                        case 8:     # Equals
+                            a = p1 if m1 == 1 else mem[x if (x := p1 + (rb if m1 else 0)) >= 0 else VOID]
+                            b = p2 if m2 == 1 else mem[x if (x := p2 + (rb if m2 else 0)) >= 0 else VOID]
+                            addr = x if (x := p3 + (rb if m3 else 0)) >= 0 else VOID
+                            mem[addr] = 1 if a == b else 0
+                            if code_map[addr]: self.invalidate(addr)
+                            ip = next_ip
+                        case 3:     # Input data
+                            addr = x if (x := p1 + (rb if m1 else 0)) >= 0 else VOID
+                            mem[addr]   # Make sure the address is in the program image before consuming input
+                            self.instr_ptr, self.rel_base = ip, rb
+                            in_callback = True
+                            val = recv()
+                            in_callback = False
+                            if val is None:         # Return control to the host to await new input
+                                executed -= 1
+                                break
+                            mem[addr] = val
+                            if code_map[addr]: self.invalidate(addr)
+                            ip = next_ip
+                        case 4:     # Output data
+                            a = p1 if m1 == 1 else mem[x if (x := p1 + (rb if m1 else 0)) >= 0 else VOID]
+                            ip = next_ip
+                            self.instr_ptr, self.rel_base = ip, rb
+                            in_callback = True
+                            pause = send(a)
+                            in_callback = False
+                            if pause: break
+                        case 99:    # Break
+                            self.completed = True
+                            break
+                break
+            except IndexError:
+                self.instr_ptr = ip
+                self.rel_base = rb
+                self.instructions = executed if in_callback else executed - 1
+                if in_callback: raise   # Errors of the host's callbacks are not the program's to handle
+
+                # The instruction reaches beyond the program image, so step() runs it on the paged memory. For a fused
+                # record, that is only its first instruction
+                if self.step(recv, send): return
+                self.fit_decoded()
+                ip = self.instr_ptr
+                rb = self.rel_base
+                executed = self.instructions
+
+        self.instr_ptr = ip
+        self.rel_base = rb
+        self.instructions = executed
+
+    def execute_compiled(self, recv: Callable[[], int | None], send: Callable[[int], bool | None]) -> None:
+        """Executes the program one compiled basic block at a time. I/O, halts, overwritten blocks and instructions
+        reaching beyond the program image are handled one instruction at a time by step()"""
+        mem = self.program
+        self.fit_decoded()
+        blocks = self.blocks
+        code_map = self.code_map
+        ip = self.instr_ptr
+        rb = self.rel_base
+        executed = self.instructions
+
+        while True:
+            try: block = blocks[ip]
+            except KeyError: block = self.compile(ip)
+            if block is not None:
+                ip, rb, dirty, count = block(mem, rb, code_map)
+                executed += count
+                if dirty is None: continue
+                if dirty != OUT_OF_IMAGE:
+                    self.invalidate(dirty)
+                    continue
+
+            self.instr_ptr = ip
+            self.rel_base = rb
+            self.instructions = executed
+            if self.step(recv, send): return
+            self.fit_decoded()
+            ip = self.instr_ptr
+            rb = self.rel_base
+            executed = self.instructions
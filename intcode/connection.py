@@ -0,0 +1,43 @@
+from collections import deque
+from .computer import IntcodeComputer
+
+#
+# Classes
+#
+class Connection:
+    """In-process replacement for the host end of a Pipe to an Intcode computer. The computer runs as a coroutine:
+    values sent are queued as input, and the computer only runs when the host asks for output"""
+    def __init__(self, computer: IntcodeComputer) -> None:
+        self.computer = computer
+        self.vm = computer.coroutine()
+        self.inputs = []
+        self.outputs = deque(next(self.vm))
+
+    def send(self, val: int) -> None:
+        """Queue a value as input for the computer"""
+        self.inputs.append(val)
+
+    def sendline(self, string: str) -> None:
+        """Queue a line of ASCII input for the computer"""
+        self.inputs.extend(map(ord, string + '\n'))
+
+    def poll(self) -> bool:
+        """Run the computer on the queued input, and return whether there is any output to receive"""
+        if not self.outputs and self.inputs and not self.computer.completed:
+            self.outputs.extend(self.vm.send(self.inputs))
+            self.inputs = []
+        return len(self.outputs) > 0
+
+    def recv(self) -> int:
+        """Receive the next output of the computer, running it on the queued input if needed"""
+        if not self.poll():
+            if self.computer.completed: raise EOFError('The Intcode program has halted')
+            raise BlockingIOError('The Intcode program is waiting for input')
+        return self.outputs.popleft()
+
+    def readline(self) -> str:
+        """Receive a line of ASCII output from the computer"""
+        line = ''
+        while line[-1:] != '\n':
+            line += chr(self.recv())
+        return line[:-1]
@@ -0,0 +1,43 @@
+import itertools
+
+#
+# Constants
+#
+OPERAND_COUNT = {
+    1: 3,   # Addition
+    2: 3,   # Multiplication
+    3: 1,   # Input data
+    4: 1,   # Output data
+    5: 2,   # Jump if true
+    6: 2,   # Jump if false
+    7: 3,   # Less than
+    8: 3,   # Equals
+    9: 1,   # Change relative base
+    99: 0   # Break
+}
+
+MNEMONICS = { 1: 'add', 2: 'mul', 3: 'in', 4: 'out', 5: 'jt', 6: 'jf', 7: 'lt', 8: 'eq', 9: 'arb', 99: 'hlt' }
+
+# Op codes of the superinstructions that the cached execution mode fuses from common instruction sequences
+FUSED_MOVE = 10         # 'add x, 0' or 'mul x, 1': copy a value
+FUSED_LT_JT = 75        # 'lt' followed by a 'jt' or 'jf' on its result: compare and branch
+FUSED_LT_JF = 76
+FUSED_EQ_JT = 85        # 'eq' followed by a 'jt' or 'jf' on its result: compare and branch
+FUSED_EQ_JF = 86
+FUSED_ARB_JUMP = 91     # 'arb' followed by an unconditional jump: change the stack frame and jump, e.g. a return
+
+# Index of the operand that an instruction writes its result to
+WRITE_OPERAND = { 1: 2, 2: 2, 3: 0, 7: 2, 8: 2 }
+
+#
+# Functions
+#
+def build_decode_table() -> dict:
+    """Map every valid raw instruction word to a tuple of (op code, parameter mode 1, parameter mode 2, parameter mode 3)"""
+    table = {}
+    for op_code in OPERAND_COUNT:
+        for modes in itertools.product(range(3), repeat=3):
+            table[op_code + 100*modes[0] + 1000*modes[1] + 10000*modes[2]] = (op_code, *modes)
+    return table
+
+DECODE_TABLE = build_decode_table()
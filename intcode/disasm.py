@@ -0,0 +1,206 @@
+import json
+from .decode import DECODE_TABLE, OPERAND_COUNT, WRITE_OPERAND, MNEMONICS
+
+#
+# Classes
+#
+class Instruction:
+    """A decoded instruction at a fixed address of a program"""
+    def __init__(self, addr: int, op_code: int, modes: tuple, params: list) -> None:
+        self.addr = addr
+        self.op_code = op_code
+        self.modes = modes
+        self.params = params
+
+    def __repr__(self) -> str:
+        operands = []
+        for mode, param in zip(self.modes, self.params):
+            match mode:
+                case 0: operands.append(f'[{param}]')           # Position mode
+                case 1: operands.append(f'{param}')             # Immediate mode
+                case 2: operands.append(f'[rb{param:+}]')       # Relative mode
+        return f'{MNEMONICS[self.op_code]:<4}{", ".join(operands)}'
+
+    @property
+    def next_addr(self) -> int:
+        return self.addr + len(self.params) + 1
+
+    def cells(self) -> range:
+        return range(self.addr, self.next_addr)
+
+    def write_address(self) -> int | None:
+        """Address the instruction writes to, if it is known statically"""
+        if self.op_code not in WRITE_OPERAND: return None
+        i = WRITE_OPERAND[self.op_code]
+        match self.modes[i]:
+            case 0: return self.params[i]
+            case 1: return self.addr + i + 1    # Immediate mode writes go to the parameter itself
+            case 2: return None
+
+class BasicBlock:
+    """Straight line code: execution enters at the first instruction only and leaves after the last one"""
+    def __init__(self, start: int) -> None:
+        self.start = start
+        self.instructions = []
+        self.successors = []
+        self.indirect = False   # Ends in a jump whose target is only known at run time
+
+    @property
+    def end(self) -> int:
+        return self.instructions[-1].next_addr if self.instructions else self.start
+
+class ControlFlowGraph:
+    """Static analysis of an Intcode program. The program is disassembled by following the control flow from address 0,
+    and from every constant the program stores that could be a code address (return addresses pushed before a call).
+    Jump targets in immediate mode, and in position mode pointing at cells the program never writes to, are
+    followed. Targets in relative mode, i.e. returns, are only known at run time.
+
+    Everything reached is code, the rest is data. Writes into code are flagged as self-modification. Writes in
+    relative mode can't be resolved statically, and are assumed to go to the stack"""
+    def __init__(self, program: list) -> None:
+        self.program = program
+        self.instructions = {}
+        self.code_cells = bytearray(len(program))
+        self.entries = [0]
+        self.explore(0)
+
+        # Follow constants that the program moves around and that decode as instructions, until no new code turns up
+        while True:
+            entries = [ val for val in self.moved_constants() if self.is_entry(val) ]
+            if len(entries) == 0: break
+            for entry in entries:
+                self.entries.append(entry)
+                self.explore(entry)
+
+        self.blocks = self.build_blocks()
+        self.self_modifying = [ (instr.addr, instr.write_address()) for instr in self.ordered()
+                                if instr.write_address() is not None and self.is_code(instr.write_address()) ]
+
+    def decode(self, addr: int) -> Instruction | None:
+        """Decode the instruction at 'addr', or None if there is no valid instruction"""
+        if not 0 <= addr < len(self.program): return None
+        decoded = DECODE_TABLE.get(self.program[addr])
+        if decoded is None: return None
+        op_code, *modes = decoded
+        length = OPERAND_COUNT[op_code] + 1
+        if addr + length > len(self.program): return None
+        return Instruction(addr, op_code, tuple(modes[:length-1]), self.program[addr+1:addr+length])
+
+    def is_code(self, addr: int) -> bool:
+        return 0 <= addr < len(self.code_cells) and self.code_cells[addr] == 1
+
+    def is_entry(self, addr: int) -> bool:
+        """Whether 'addr' is an unexplored address that holds a valid instruction, not overlapping known code"""
+        if addr in self.instructions or addr in self.entries: return False
+        instr = self.decode(addr)
+        return instr is not None and not any(self.is_code(cell) for cell in instr.cells())
+
+    def constant_cell(self, addr: int) -> bool:
+        """Whether no instruction found so far writes to 'addr' in position or immediate mode"""
+        return all(instr.write_address() != addr for instr in self.instructions.values())
+
+    def targets(self, instr: Instruction) -> list:
+        """Statically known successors of 'instr', with None standing in for a target only known at run time"""
+        match instr.op_code:
+            case 99: return []
+            case 5 | 6:
+                cond, target = instr.modes[0], instr.modes[1]
+                taken = None if cond != 1 else (instr.params[0] != 0) == (instr.op_code == 5)
+                successors = [] if taken is True else [instr.next_addr]
+                if taken is False: return successors
+                if target == 1: successors.append(instr.params[1])
+                elif target == 0 and 0 <= instr.params[1] < len(self.program) and self.constant_cell(instr.params[1]):
+                    successors.append(self.program[instr.params[1]])
+                else: successors.append(None)
+                return successors
+            case _: return [instr.next_addr]
+
+    def explore(self, entry: int) -> None:
+        """Disassemble everything reachable from 'entry'"""
+        todo = [entry]
+        while todo:
+            addr = todo.pop()
+            if addr is None or addr in self.instructions: continue
+            instr = self.decode(addr)
+            if instr is None: continue
+            self.instructions[addr] = instr
+            for cell in instr.cells(): self.code_cells[cell] = 1
+            todo += self.targets(instr)
+
+    def moved_constants(self) -> set:
+        """Immediate values that code copies into memory unchanged, i.e. 'add x, 0' and 'mul x, 1'"""
+        constants = set()
+        for instr in self.instructions.values():
+            if instr.op_code not in (1, 2) or instr.modes[:2] != (1, 1): continue
+            a, b = instr.params[:2]
+            neutral = 0 if instr.op_code == 1 else 1
+            if b == neutral: constants.add(a)
+            if a == neutral: constants.add(b)
+        return constants
+
+    def ordered(self) -> list:
+        return [ self.instructions[addr] for addr in sorted(self.instructions) ]
+
+    def build_blocks(self) -> dict:
+        """Split the disassembled code into basic blocks, keyed by their first address"""
+        leaders = set(self.entries)
+        for instr in self.instructions.values():
+            if instr.op_code in (5, 6, 99):
+                leaders.update(target for target in self.targets(instr) if target is not None)
+                leaders.add(instr.next_addr)
+
+        blocks = {}
+        block = None
+        for instr in self.ordered():
+            if block is None or instr.addr in leaders or instr.addr != block.end:
+                block = blocks[instr.addr] = BasicBlock(instr.addr)
+            block.instructions.append(instr)
+        for block in blocks.values():
+            last = block.instructions[-1]
+            targets = self.targets(last)
+            block.indirect = None in targets
+            block.successors = [ target for target in targets if target in blocks ]
+        return blocks
+
+    def regions(self) -> list:
+        """The program as a list of (first address, end address, 'code' or 'data') regions"""
+        regions = []
+        for addr, flag in enumerate(self.code_cells):
+            kind = 'code' if flag else 'data'
+            if regions and regions[-1][2] == kind: regions[-1][1] = addr + 1
+            else: regions.append([addr, addr + 1, kind])
+        return [ tuple(region) for region in regions ]
+
+    def listing(self) -> str:
+        """Disassembly of the whole program, with data regions shown as raw values"""
+        lines = []
+        for start, end, kind in self.regions():
+            if kind == 'data':
+                lines.append(f'{start:>6}: data {", ".join(map(str, self.program[start:end]))}')
+                continue
+            for addr in range(start, end):
+                if addr not in self.instructions: continue
+                label = '>' if addr in self.blocks else ' '
+                flag = '  ; writes into code' if any(addr == src for src, _ in self.self_modifying) else ''
+                lines.append(f'{addr:>6}:{label}{self.instructions[addr]}{flag}')
+        return '\n'.join(lines)
+
+    def to_dot(self) -> str:
+        """The control flow graph in Graphviz DOT format"""
+        lines = ['digraph intcode {', '    node [shape=box fontname=monospace];']
+        for start, block in sorted(self.blocks.items()):
+            text = '\\l'.join(f'{instr.addr}: {instr}' for instr in block.instructions) + '\\l'
+            lines.append(f'    b{start} [label="{text}"{" color=red" if block.indirect else ""}];')
+            for successor in block.successors: lines.append(f'    b{start} -> b{successor};')
+        lines.append('}')
+        return '\n'.join(lines)
+
+    def to_json(self) -> str:
+        """The control flow graph, regions and self-modifying writes as JSON"""
+        return json.dumps({
+            'blocks': [ { 'start': block.start, 'end': block.end, 'successors': block.successors,
+                          'indirect': block.indirect, 'instructions': [ str(instr) for instr in block.instructions ] }
+                        for _, block in sorted(self.blocks.items()) ],
+            'regions': [ { 'start': start, 'end': end, 'kind': kind } for start, end, kind in self.regions() ],
+            'self_modifying': [ { 'instruction': src, 'address': dst } for src, dst in self.self_modifying ]
+        }, indent=2)
@@ -0,0 +1,91 @@
+from typing import Callable
+
+#
+# Classes
+#
+class MemoryView:
+    """Live, typed view of a range of the memory of a computer. Without fields, every element is a single cell. With
+    fields, every element is a record of consecutive cells, returned as a dict by field name, e.g. to read a table
+    of items the program keeps in memory. The view reads through the computer, so it always shows its current state"""
+    def __init__(self, computer, start: int, length: int, fields: tuple | None = None) -> None:
+        self.computer = computer
+        self.start = start
+        self.length = length
+        self.fields = fields
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int | slice):
+        if isinstance(index, slice): return [ self[i] for i in range(*index.indices(self.length)) ]
+        if index < 0: index += self.length
+        if not 0 <= index < self.length: raise IndexError(f'Index {index} is outside of the view')
+        memory = self.computer.memory
+        if self.fields is None: return memory[self.start + index]
+        pos = self.start + index * len(self.fields)
+        return { field: memory[pos + i] for i, field in enumerate(self.fields) }
+
+    def __iter__(self):
+        return (self[i] for i in range(self.length))
+
+    def tolist(self) -> list:
+        return list(self)
+
+    def text(self) -> str:
+        """The cells of the view as ASCII text, e.g. for strings the program prints"""
+        return ''.join(chr(val) for val in self[:] if 0 <= val < 128)
+
+class Watcher:
+    """Write watchpoints on memory regions. Attach it as the computer's 'watcher'; while it is attached the computer
+    runs one instruction at a time, and every write into a watched region calls callback(computer, address, old value,
+    new value) right after the instruction. A callback returning True pauses the computer, like 'send' does"""
+    def __init__(self) -> None:
+        self.watchpoints = []
+
+    def copy(self) -> 'Watcher':
+        """A watcher with the same watchpoints, e.g. for a fork of the computer"""
+        watcher = Watcher()
+        watcher.watchpoints = self.watchpoints.copy()
+        return watcher
+
+    def watch(self, start: int, end: int, callback: Callable[[object, int, int, int], bool | None]) -> None:
+        """Call 'callback' on every write to an address from 'start' up to, but not including, 'end'"""
+        self.watchpoints.append((start, end, callback))
+
+    def start(self, computer) -> None:
+        """Hook called when a computer starts executing (see IntcodeComputer.execute_instrumented)"""
+
+    def instruction(self, computer, ip: int, op_code: int, addr: int | None, old: int | None,
+                    output: int | None) -> bool:
+        """Hook called after every instruction: call the callbacks of the watchpoints its write falls in"""
+        if addr is None: return False
+        new = computer.memory[addr]
+        hits = [ callback(computer, addr, old, new) for start, end, callback in self.watchpoints
+                 if start <= addr < end ]
+        return any(hits)
+
+    def stop(self, computer, waiting: bool) -> None:
+        """Hook called when a computer stops executing"""
+
+#
+# Functions
+#
+def find(computer, pattern: list, start: int = 0, end: int | None = None) -> list:
+    """Addresses from 'start' up to 'end' (by default the end of the program image) where the values of 'pattern'
+    occur in memory, with None in the pattern matching any value"""
+    memory = computer.memory
+    if end is None: end = len(memory.image)
+    cells = memory.image[start:end] if end <= len(memory.image) else [ memory[pos] for pos in range(start, end) ]
+
+    # Scan for the first fixed value of the pattern, and only compare the rest where it occurs
+    anchor = next((i for i, val in enumerate(pattern) if val is not None), None)
+    if anchor is None: return list(range(start, max(start, end - len(pattern) + 1)))
+    matches = []
+    pos = anchor
+    while True:
+        try: pos = cells.index(pattern[anchor], pos)
+        except ValueError: return matches
+        first = pos - anchor
+        if first + len(pattern) > len(cells): return matches
+        if all(val is None or cells[first + i] == val for i, val in enumerate(pattern)): matches.append(start + first)
+        pos += 1
@@ -0,0 +1,143 @@
+import numpy as np
+from .decode import DECODE_TABLE
+
+#
+# Classes
+#
+class LockstepComputer:
+    """Runs many instances of one Intcode program in lockstep, each instance being a row of a 2-D NumPy array. Every
+    step executes one instruction, as a handful of vector operations, for all running instances at the lowest
+    instruction pointer. Instances whose control flow diverged therefore wait for each other, and run as one group
+    again where their paths meet. Memory and I/O values are 64 bit integers"""
+    def __init__(self, program: str | list, count: int) -> None:
+        if isinstance(program, str): program = map(int, program.split(','))
+        self.memory = np.tile(np.array(list(program), dtype=np.int64), (count, 1))
+        self.count = count
+        self.instr_ptr = np.zeros(count, dtype=np.int64)
+        self.rel_base = np.zeros(count, dtype=np.int64)
+        self.completed = np.zeros(count, dtype=bool)
+        self.input_buffer = np.zeros((count, 0), dtype=np.int64)
+        self.input_ptr = np.zeros(count, dtype=np.int64)
+        self.output_buffer = np.zeros((count, 4), dtype=np.int64)
+        self.output_count = np.zeros(count, dtype=np.int64)
+        self.steps = 0          # Number of vector steps executed so far
+
+    def has_completed(self) -> bool:
+        return bool(self.completed.all())
+
+    def read(self, pos: int) -> np.ndarray:
+        """Read the value at memory position 'pos' of every instance"""
+        self.fit(pos)
+        return self.memory[:, pos]
+
+    def write(self, pos: int, values: int | np.ndarray) -> None:
+        """Write a value (or one value per instance) to memory position 'pos' of every instance"""
+        self.fit(pos)
+        self.memory[:, pos] = values
+
+    def fit(self, pos: int) -> None:
+        """Make sure memory position 'pos' exists, growing the memory of all instances if needed"""
+        if pos < 0: raise IndexError(f'Negative address {pos}')
+        width = self.memory.shape[1]
+        if pos >= width:
+            self.memory = np.pad(self.memory, ((0, 0), (0, max(pos + 1, 2 * width) - width)))
+
+    def fetch(self, rows: np.ndarray, pos: int, mode: int) -> np.ndarray:
+        """Operand values for 'rows' of the parameter at memory position 'pos'"""
+        param = self.memory[rows, pos]
+        if mode == 1: return param
+        addr = param + self.rel_base[rows] if mode == 2 else param
+        self.fit(int(addr.max()))
+        if addr.min() < 0: raise IndexError(f'Negative address {addr.min()}')
+        return self.memory[rows, addr]
+
+    def stor(self, rows: np.ndarray, pos: int, mode: int, values: np.ndarray) -> None:
+        """Store one value per row at the address given by the parameter at memory position 'pos'"""
+        if mode == 1:
+            self.memory[rows, pos] = values
+            return
+        param = self.memory[rows, pos]
+        addr = param + self.rel_base[rows] if mode == 2 else param
+        self.fit(int(addr.max()))
+        if addr.min() < 0: raise IndexError(f'Negative address {addr.min()}')
+        self.memory[rows, addr] = values
+
+    def run(self, inputs: list | np.ndarray | None = None) -> list:
+        """Append one row of input values per instance to its input, and run until every instance has halted or is
+        waiting for more input. Returns the outputs produced per instance"""
+        if inputs is not None:
+            inputs = np.asarray(inputs, dtype=np.int64).reshape(self.count, -1)
+            self.input_buffer = np.hstack((self.input_buffer, inputs))
+        self.execute()
+        outputs = [self.output_buffer[i, :n].tolist() for i, n in enumerate(self.output_count)]
+        self.output_count[:] = 0
+        return outputs
+
+    def execute(self) -> None:
+        """Executes all instances until they have halted or wait for input"""
+        blocked = self.completed.copy()
+        while True:
+            live = np.flatnonzero(~blocked)
+            if len(live) == 0: return
+            ips = self.instr_ptr[live]
+            ip = int(ips.min())
+            rows = live[ips == ip]
+            self.fit(ip + 3)
+
+            # Instances at the same position may still hold different instructions, e.g. after self-modification
+            words = self.memory[rows, ip]
+            if words.min() == words.max(): self.step(ip, int(words[0]), rows, blocked)
+            else:
+                for word in np.unique(words): self.step(ip, int(word), rows[words == word], blocked)
+
+    def step(self, ip: int, word: int, rows: np.ndarray, blocked: np.ndarray) -> None:
+        """Executes instruction 'word' at position 'ip' for all instances in 'rows'. Instances that halt or wait for
+        input are marked in 'blocked'"""
+        self.steps += 1
+        try: op_code, m1, m2, m3 = DECODE_TABLE[word]
+        except KeyError:
+            print(f'Error: Unknown opcode {word % 100} in {len(rows)} instance(s)... aborting them.')
+            self.completed[rows] = True
+            blocked[rows] = True
+            return
+
+        match op_code:
+            case 1:     # Addition
+                self.stor(rows, ip + 3, m3, self.fetch(rows, ip + 1, m1) + self.fetch(rows, ip + 2, m2))
+                self.instr_ptr[rows] = ip + 4
+            case 2:     # Multiplication
+                self.stor(rows, ip + 3, m3, self.fetch(rows, ip + 1, m1) * self.fetch(rows, ip + 2, m2))
+                self.instr_ptr[rows] = ip + 4
+            case 3:     # Input data
+                ptr = self.input_ptr[rows]
+                ready = ptr < self.input_buffer.shape[1]
+                blocked[rows[~ready]] = True    # Out of input: wait for the next run()
+                rows = rows[ready]
+                if len(rows) == 0: return
+                self.stor(rows, ip + 1, m1, self.input_buffer[rows, ptr[ready]])
+                self.input_ptr[rows] += 1
+                self.instr_ptr[rows] = ip + 2
+            case 4:     # Output data
+                count = self.output_count[rows]
+                width = self.output_buffer.shape[1]
+                if count.max() >= width: self.output_buffer = np.pad(self.output_buffer, ((0, 0), (0, width)))
+                self.output_buffer[rows, count] = self.fetch(rows, ip + 1, m1)
+                self.output_count[rows] += 1
+                self.instr_ptr[rows] = ip + 2
+            case 5 | 6: # Jump if true / jump if false
+                cond = self.fetch(rows, ip + 1, m1)
+                jump = rows[cond != 0] if op_code == 5 else rows[cond == 0]
+                self.instr_ptr[rows] = ip + 3
+                if len(jump) > 0: self.instr_ptr[jump] = self.fetch(jump, ip + 2, m2)
+            case 7:     # Less than
+                self.stor(rows, ip + 3, m3, self.fetch(rows, ip + 1, m1) < self.fetch(rows, ip + 2, m2))
+                self.instr_ptr[rows] = ip + 4
+            case 8:     # Equals
+                self.stor(rows, ip + 3, m3, self.fetch(rows, ip + 1, m1) == self.fetch(rows, ip + 2, m2))
+                self.instr_ptr[rows] = ip + 4
+            case 9:     # Change relative base
+                self.rel_base[rows] += self.fetch(rows, ip + 1, m1)
+                self.instr_ptr[rows] = ip + 2
+            case 99:    # Break
+                self.completed[rows] = True
+                blocked[rows] = True
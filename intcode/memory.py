@@ -0,0 +1,80 @@
+import sys
+
+#
+# Constants
+#
+PAGE_BITS = 10
+PAGE_SIZE = 1 << PAGE_BITS
+PAGE_MASK = PAGE_SIZE - 1
+VOID = 1 << 62          # Index beyond any program image. The execution loops use it for negative addresses, so those
+                        # raise IndexError and go through the paged memory like any other address outside of the image
+DENSE_GAP = 4           # Writes up to this many pages beyond the program image grow the image instead of paging
+
+#
+# Classes
+#
+class PagedMemory:
+    """Intcode memory that grows on demand. The program image is a dense list, which the execution loops index
+    directly as their fast path. Writes just beyond the image grow it by whole pages, e.g. for the stack most programs
+    keep after their code. Addresses further away live in fixed size pages that are allocated on first write. Never
+    written cells read as 0.
+
+    Forks share the image and all pages with their parent, copy-on-write. Pages are copied by whichever side writes to
+    them first. The image is copied when it is first written to, unless no other memory refers to it anymore. Pages
+    that aren't owned can be any read-only sequence, e.g. views into a memory mapped checkpoint"""
+    def __init__(self, image: list, pages: dict | None = None, image_shared: bool = False) -> None:
+        self.image = image
+        self.pages = {} if pages is None else pages
+        self.image_shared = image_shared
+        self.owned_pages = set()
+
+    def __getitem__(self, pos: int) -> int:
+        if pos < len(self.image):
+            if pos < 0: raise IndexError(f'Negative address {pos}')
+            return self.image[pos]
+        page = self.pages.get(pos >> PAGE_BITS)
+        return 0 if page is None else page[pos & PAGE_MASK]
+
+    def __setitem__(self, pos: int, val: int) -> None:
+        if pos >= len(self.image) and pos >> PAGE_BITS <= (len(self.image) >> PAGE_BITS) + DENSE_GAP: self.grow(pos)
+        if pos < len(self.image):
+            if pos < 0: raise IndexError(f'Negative address {pos}')
+            if self.image_shared: self.own_image()
+            self.image[pos] = val
+            return
+        page_no = pos >> PAGE_BITS
+        if page_no not in self.owned_pages:
+            page = self.pages.get(page_no)
+            self.pages[page_no] = [0] * PAGE_SIZE if page is None else list(page)
+            self.owned_pages.add(page_no)
+        self.pages[page_no][pos & PAGE_MASK] = val
+
+    def grow(self, pos: int) -> None:
+        """Grow the program image in place up to the end of the page holding 'pos', moving in any pages it covers"""
+        self.own_image()
+        start = len(self.image)
+        end = (pos | PAGE_MASK) + 1
+        self.image.extend([0] * (end - start))
+        for page_no in range(start >> PAGE_BITS, end >> PAGE_BITS):
+            page = self.pages.pop(page_no, None)
+            if page is None: continue
+            first = max(page_no << PAGE_BITS, start)
+            self.image[first:(page_no + 1) << PAGE_BITS] = page[first & PAGE_MASK:]
+
+    def own_image(self) -> None:
+        """Make sure the image is not shared with any fork, so it can be written to in place. The image is only copied
+        if some other memory still refers to it, so the last of the forks sharing an image takes it over as it is"""
+        if self.image_shared:
+            if sys.getrefcount(self.image) > 2: self.image = self.image.copy()     # This memory, and the argument
+            self.image_shared = False
+
+    def fork(self, share_image: bool = True) -> 'PagedMemory':
+        """Create a copy-on-write copy of the memory. With 'share_image' False, the image is copied right away"""
+        self.owned_pages.clear()
+        if not share_image: return PagedMemory(self.image.copy(), dict(self.pages), False)
+        self.image_shared = True
+        return PagedMemory(self.image, dict(self.pages), True)
+
+    def size(self) -> int:
+        """Number of cells actually allocated: the program image plus all pages written so far"""
+        return len(self.image) + len(self.pages) * PAGE_SIZE
@@ -0,0 +1,111 @@
+import atexit, os, sys, time
+from collections import Counter
+from .decode import OPERAND_COUNT, MNEMONICS
+
+#
+# Classes
+#
+class Profiler:
+    """Guest level profile of Intcode programs: how often every address and op code was executed, which jumps were
+    taken, and how long the programs were blocked waiting for the host to provide input. One profiler can be attached
+    to many computers, which are timed separately, so the input wait adds up the waits of all of them. Attach it as
+    the computer's 'profiler'. A computer only runs its instrumented loop while a hook is attached to it, so the
+    regular execution loops pay nothing for it. That loop single-steps, so its throughput is that of the stepper, not
+    of the computer's execution mode"""
+    def __init__(self) -> None:
+        self.pc_counts = Counter()
+        self.op_counts = Counter()
+        self.jumps = Counter()      # Taken jumps, as (from address, to address)
+        self.pc_ops = {}
+        self.instructions = 0
+        self.run_time = 0.0
+        self.input_wait = 0.0
+        self.blocked_since = {}     # When each waiting computer stopped for input, by id(computer), until it runs again
+        self.started = {}           # When each running computer started, by id(computer)
+
+    def start(self, computer) -> None:
+        """Hook called when a computer starts executing (see IntcodeComputer.execute_instrumented)"""
+        now = self.started[id(computer)] = time.perf_counter()
+        blocked_since = self.blocked_since.pop(id(computer), None)
+        if blocked_since is not None: self.input_wait += now - blocked_since
+
+    def instruction(self, computer, ip: int, op_code: int, addr: int | None, old: int | None,
+                    output: int | None) -> None:
+        """Hook called after every instruction: count it, and any jump it took"""
+        self.pc_counts[ip] += 1
+        self.pc_ops[ip] = op_code
+        if computer.instr_ptr != ip + OPERAND_COUNT[op_code] + 1 and not computer.completed:
+            self.jumps[(ip, computer.instr_ptr)] += 1
+
+    def stop(self, computer, waiting: bool) -> None:
+        """Hook called when a computer stops executing"""
+        end = time.perf_counter()
+        self.run_time += end - self.started.pop(id(computer))
+        if waiting: self.blocked_since[id(computer)] = end
+
+    def collect(self) -> None:
+        """Bring the per op code and total instruction counts up to date with the per address counts"""
+        self.op_counts = Counter()
+        for pc, count in self.pc_counts.items(): self.op_counts[self.pc_ops[pc]] += count
+        self.instructions = self.pc_counts.total()
+
+    def blocks(self) -> list:
+        """Basic blocks of the executed code as (first address, last address, instructions executed), hottest first.
+        Blocks start at jump targets and after jumps and I/O, and only cover code that was actually executed"""
+        leaders = { dst for _, dst in self.jumps }
+        blocks = []
+        prev_end = None
+        for pc in sorted(self.pc_counts):
+            op_code = self.pc_ops[pc]
+            if pc != prev_end or pc in leaders: blocks.append([pc, pc, 0])
+            blocks[-1][1] = pc
+            blocks[-1][2] += self.pc_counts[pc]
+            prev_end = None if op_code in (3, 4, 5, 6, 99) else pc + OPERAND_COUNT[op_code] + 1
+        return sorted(map(tuple, blocks), key=lambda block: -block[2])
+
+    def loops(self) -> list:
+        """Loops closed by a backward jump, as (first address, jump address, iterations, instructions executed inside),
+        hottest first"""
+        loops = []
+        for (src, dst), count in self.jumps.items():
+            if dst > src: continue
+            loops.append((dst, src, count, sum(n for pc, n in self.pc_counts.items() if dst <= pc <= src)))
+        return sorted(loops, key=lambda loop: -loop[3])
+
+    def report(self, file=sys.stdout, top: int = 10) -> None:
+        """Print a summary of the profile: throughput, op code mix, and the hottest basic blocks and loops"""
+        self.collect()
+        rate = self.instructions / self.run_time if self.run_time > 0 else 0
+        print(f'Intcode profile: {self.instructions} instructions in {self.run_time:.3f} s '
+              f'({rate:,.0f} instructions/s profiled, single-stepping), '
+              f'{self.input_wait:.3f} s blocked waiting for input', file=file)
+        if self.instructions == 0: return
+
+        print('Op codes:', file=file)
+        for op_code, count in self.op_counts.most_common():
+            share = 100 * count / self.instructions
+            print(f'  {MNEMONICS.get(op_code, "???"):<4} {count:>12} {share:6.2f}%', file=file)
+
+        print('Hottest basic blocks:', file=file)
+        for first, last, count in self.blocks()[:top]:
+            print(f'  {first:>6}-{last:<6} {count:>12} {100 * count / self.instructions:6.2f}%', file=file)
+
+        print('Hottest loops:', file=file)
+        for first, last, iterations, count in self.loops()[:top]:
+            share = 100 * count / self.instructions
+            print(f'  {first:>6}-{last:<6} {iterations:>9} iterations {count:>12} {share:6.2f}%', file=file)
+
+#
+# Functions
+#
+def environment_profiler() -> Profiler | None:
+    """The process wide profiler that is attached to every computer when the INTCODE_PROFILE environment variable is
+    set. It prints its report to STDERR when the process exits"""
+    global shared_profiler
+    if not os.environ.get('INTCODE_PROFILE'): return None
+    if shared_profiler is None:
+        shared_profiler = Profiler()
+        atexit.register(shared_profiler.report, sys.stderr)
+    return shared_profiler
+
+shared_profiler = None
@@ -0,0 +1,76 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Generator, Iterable
+from .computer import IntcodeComputer, ExecutionMode
+from .trace import encode_state, decode_state
+
+#
+# Constants
+#
+CHUNK_SIZE = 256    # Default number of items a worker evaluates per task
+
+#
+# Functions
+#
+def feed_item(computer: IntcodeComputer, item) -> list:
+    """Default 'feed' of a sweep: the item is the list of input values"""
+    return list(item)
+
+def collect_outputs(computer: IntcodeComputer, outputs: list) -> list:
+    """Default 'collect' of a sweep: the result is the list of output values"""
+    return outputs
+
+def init_worker(state: bytes, mode: int) -> None:
+    """Initializer of a sweep worker process: restore the booted computer, and keep it as the snapshot to fork from"""
+    global worker_computer
+    worker_computer = IntcodeComputer([], mode)
+    decode_state(state, 0, worker_computer)
+    worker_computer.backup()
+
+def run_chunk(chunk: list, feed: Callable, collect: Callable) -> list:
+    """Evaluate a chunk of items in a sweep worker, each on a fresh copy of the booted computer"""
+    results = []
+    for item in chunk:
+        worker_computer.restore()
+        outputs = worker_computer.run(feed(worker_computer, item))
+        results.append((item, collect(worker_computer, outputs)))
+    return results
+
+def sweep(program: str | list | IntcodeComputer, items: Iterable, feed: Callable = feed_item,
+          collect: Callable = collect_outputs, boot: list = (), mode: int = ExecutionMode.INTERPRETED,
+          workers: int | None = None, chunk_size: int = CHUNK_SIZE) -> Generator[tuple, None, None]:
+    """Evaluate a program over a whole input space, using all cores. The program is booted once with the 'boot' input,
+    until it waits for more input, and its state is shipped to a pool of worker processes. For every item, a worker
+    starts from that state, calls feed(computer, item) to poke memory and get the input values, runs the program and
+    calls collect(computer, outputs) for the result. The functions have to be picklable, i.e. module level. Instead of
+    a program, 'program' can be a computer to boot from as it is, e.g. one restored from a checkpoint; the workers
+    then run in its execution mode.
+
+    Generates (item, result) tuples in the order of 'items'. The items are read lazily, and only a few chunks per
+    worker are underway at any time, so closing the generator early cancels the rest of the sweep"""
+    if isinstance(program, IntcodeComputer):
+        computer = program.fork()
+        mode = computer.mode
+    else: computer = IntcodeComputer(program, mode)
+    computer.run(boot)
+    workers = workers or os.cpu_count()
+    items = iter(items)
+
+    executor = ProcessPoolExecutor(workers, initializer=init_worker, initargs=(encode_state(computer), mode))
+    try:
+        futures = deque()
+        while chunk := list(islice(items, chunk_size)):
+            futures.append(executor.submit(run_chunk, chunk, feed, collect))
+            if len(futures) >= 2 * workers: yield from futures.popleft().result()
+        while futures: yield from futures.popleft().result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+def first_match(program: str | list, items: Iterable, predicate: Callable, **kwargs) -> tuple | None:
+    """The first (item, result) of a sweep, in the order of 'items', whose result satisfies 'predicate', or None.
+    Takes the same keyword arguments as sweep()"""
+    results = sweep(program, items, **kwargs)
+    try: return next(((item, result) for item, result in results if predicate(result)), None)
+    finally: results.close()
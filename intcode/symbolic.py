@@ -0,0 +1,105 @@
+from .decode import DECODE_TABLE, OPERAND_COUNT, WRITE_OPERAND
+
+#
+# Constants
+#
+MAX_STEPS = 1000000     # Symbolic execution gives up after this many instructions
+
+#
+# Classes
+#
+class SymbolicError(Exception):
+    """Raised when a program can't be executed symbolically, e.g. when a result turns non-linear in the symbols"""
+
+class Affine:
+    """Affine expression over named symbols: a constant plus an integer coefficient per symbol"""
+    def __init__(self, const: int = 0, coeffs: dict | None = None) -> None:
+        self.const = const
+        self.coeffs = {} if coeffs is None else { k: v for k, v in coeffs.items() if v != 0 }
+
+    @classmethod
+    def symbol(cls, name: str) -> 'Affine':
+        return cls(0, { name: 1 })
+
+    def __repr__(self) -> str:
+        return ' + '.join([f'{v}*{k}' for k, v in self.coeffs.items()] + [str(self.const)])
+
+    def __add__(self, other: 'Affine') -> 'Affine':
+        coeffs = self.coeffs.copy()
+        for k, v in other.coeffs.items(): coeffs[k] = coeffs.get(k, 0) + v
+        return Affine(self.const + other.const, coeffs)
+
+    def __mul__(self, other: 'Affine') -> 'Affine':
+        if other.is_constant(): self, other = other, self
+        if not self.is_constant(): raise SymbolicError(f'Product of ({self}) and ({other}) is not linear')
+        return Affine(self.const * other.const, { k: self.const * v for k, v in other.coeffs.items() })
+
+    def is_constant(self) -> bool:
+        return len(self.coeffs) == 0
+
+    def evaluate(self, values: dict) -> int:
+        """Value of the expression for the given symbol values"""
+        return self.const + sum(v * values[k] for k, v in self.coeffs.items())
+
+#
+# Functions
+#
+def concrete(val: Affine | None, what: str) -> int:
+    """The integer value of 'val', if it doesn't depend on any symbol"""
+    if val is None or not val.is_constant(): raise SymbolicError(f'{what} depends on a symbolic value')
+    return val.const
+
+def execute_symbolic(program: list, symbols: dict) -> list:
+    """Executes 'program' with the memory cells given as keys of 'symbols' replaced by the named symbols. Returns the
+    final memory as Affine expressions in those symbols. A cell read from an address that depends on a symbol is None,
+    which is fine as long as nothing uses it. Raises SymbolicError when the program can't be followed symbolically:
+    symbolic jumps, comparisons, write addresses or instructions, non-linear results, and any I/O"""
+    mem = [Affine(v) for v in program]
+    for pos, name in symbols.items(): mem[pos] = Affine.symbol(name)
+    ip = 0
+    rb = 0
+
+    def address(pos: int, mode: int) -> int | None:
+        """Address of the parameter at 'pos', or None if it depends on a symbol"""
+        if mode == 1: return pos
+        param = mem[pos] if pos < len(mem) else Affine()
+        if param is None or not param.is_constant(): return None
+        addr = param.const + (rb if mode == 2 else 0)
+        if addr < 0: raise SymbolicError(f'Negative address {addr}')
+        return addr
+
+    def fetch(pos: int, mode: int) -> Affine | None:
+        addr = address(pos, mode)
+        if addr is None: return None
+        return mem[addr] if addr < len(mem) else Affine()
+
+    for _ in range(MAX_STEPS):
+        if not 0 <= ip < len(mem): raise SymbolicError(f'Instruction pointer {ip} is outside of the program')
+        word = concrete(mem[ip], f'Instruction at {ip}')
+        try: op_code, *modes = DECODE_TABLE[word]
+        except KeyError: raise SymbolicError(f'Unknown opcode {word % 100} at {ip}')
+        a, b = (fetch(ip + i + 1, modes[i]) if i < OPERAND_COUNT[op_code] else None for i in range(2))
+
+        match op_code:
+            case 1 | 2 | 7 | 8:     # Arithmetic and comparisons
+                if op_code == 1: val = None if a is None or b is None else a + b
+                elif op_code == 2: val = None if a is None or b is None else a * b
+                elif op_code == 7: val = Affine(int(concrete(a, 'Comparison') < concrete(b, 'Comparison')))
+                else: val = Affine(int(concrete(a, 'Comparison') == concrete(b, 'Comparison')))
+                i = WRITE_OPERAND[op_code]
+                addr = address(ip + i + 1, modes[i])
+                if addr is None: raise SymbolicError(f'Write address at {ip} depends on a symbolic value')
+                if addr >= len(mem): mem.extend([Affine()] * (addr + 1 - len(mem)))
+                mem[addr] = val
+                ip += 4
+            case 5 | 6:             # Jump if true / jump if false
+                if (concrete(a, 'Jump condition') != 0) == (op_code == 5): ip = concrete(b, 'Jump target')
+                else: ip += 3
+            case 9:                 # Change relative base
+                rb += concrete(a, 'Relative base')
+                ip += 2
+            case 99:                # Break
+                return mem
+            case _:                 # Input and output
+                raise SymbolicError(f'I/O instruction at {ip} can\'t be executed symbolically')
+    raise SymbolicError(f'Program did not halt within {MAX_STEPS} instructions')
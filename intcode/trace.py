@@ -0,0 +1,186 @@
+from typing import Generator
+from .computer import IntcodeComputer
+from .decode import OPERAND_COUNT, WRITE_OPERAND
+from .memory import PagedMemory, PAGE_SIZE
+
+#
+# Constants
+#
+MAGIC = b'ICTRACE1'
+CHECKPOINT_INTERVAL = 100000    # Default number of instructions between two full state checkpoints
+
+#
+# Functions
+#
+def put_varint(buf: bytearray, val: int) -> None:
+    """Append a signed integer in zigzag LEB128 encoding: small values of either sign take a single byte"""
+    val = val << 1 if val >= 0 else (-val << 1) - 1
+    while val > 0x7f:
+        buf.append(val & 0x7f | 0x80)
+        val >>= 7
+    buf.append(val)
+
+def get_varint(data: bytes, pos: int) -> tuple:
+    """Decode the zigzag LEB128 integer at 'pos'. Returns the value and the position after it"""
+    val = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        val |= (byte & 0x7f) << shift
+        shift += 7
+        if byte < 0x80: break
+    return (val >> 1 if val & 1 == 0 else -((val + 1) >> 1)), pos
+
+def encode_state(computer: IntcodeComputer) -> bytes:
+    """Full state of a computer as a checkpoint: instruction pointer, relative base, completion and all of memory"""
+    buf = bytearray()
+    for val in (computer.instr_ptr, computer.rel_base, int(computer.completed), len(computer.memory.image)):
+        put_varint(buf, val)
+    for val in computer.memory.image: put_varint(buf, val)
+    put_varint(buf, len(computer.memory.pages))
+    for page_no, page in computer.memory.pages.items():
+        put_varint(buf, page_no)
+        for val in page: put_varint(buf, val)
+    return bytes(buf)
+
+def decode_state(data: bytes, pos: int, computer: IntcodeComputer) -> None:
+    """Put 'computer' in the state of the checkpoint encoded at 'pos'"""
+    (ip, rb, completed, size), pos = get_varints(data, pos, 4)
+    image, pos = get_varints(data, pos, size)
+    (page_count,), pos = get_varints(data, pos, 1)
+    pages = {}
+    for _ in range(page_count):
+        (page_no,), pos = get_varints(data, pos, 1)
+        pages[page_no], pos = get_varints(data, pos, PAGE_SIZE)
+    computer.memory = PagedMemory(image, pages)
+    computer.instr_ptr = ip
+    computer.rel_base = rb
+    computer.completed = bool(completed)
+    computer.clear_decoded()
+
+def get_varints(data: bytes, pos: int, count: int) -> tuple:
+    """Decode 'count' consecutive integers. Returns them as a list, and the position after them"""
+    vals = []
+    for _ in range(count):
+        val, pos = get_varint(data, pos)
+        vals.append(val)
+    return vals, pos
+
+#
+# Classes
+#
+class TraceRecorder:
+    """Records the execution of a computer to a compact binary trace file. Attach it as the computer's 'recorder', and
+    close() it when done. The file is a sequence of chunks, each made up of the instruction count it starts at, a full
+    state checkpoint, and one record per instruction executed: the jump distance from the expected address, the op
+    code, the address and value of any memory write, and the value of any output. All integers are varints, so an
+    instruction that doesn't jump takes 2 bytes plus its data. Input values are recorded as the write they make"""
+    def __init__(self, path: str, checkpoint_interval: int = CHECKPOINT_INTERVAL) -> None:
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC)
+        self.checkpoint_interval = checkpoint_interval
+        self.count = 0
+        self.chunk_start = 0
+        self.checkpoint = None
+        self.records = bytearray()
+        self.next_ip = 0
+
+    def flush(self) -> None:
+        """Write the current chunk to the file"""
+        if self.checkpoint is None: return
+        chunk = bytearray()
+        for val in (self.chunk_start, len(self.checkpoint), self.count - self.chunk_start, len(self.records)):
+            put_varint(chunk, val)
+        self.file.write(chunk + self.checkpoint + self.records)
+        self.checkpoint = None
+        self.records = bytearray()
+
+    def start_chunk(self, computer: IntcodeComputer) -> None:
+        """Finish the current chunk, and start a new one with a checkpoint of the current state of 'computer'"""
+        self.flush()
+        self.chunk_start = self.count
+        self.checkpoint = encode_state(computer)
+        self.next_ip = 0        # The first record of a chunk holds an absolute address
+
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
+
+    def start(self, computer: IntcodeComputer) -> None:
+        """Hook called when a computer starts executing (see IntcodeComputer.execute_instrumented)"""
+        if self.checkpoint is None: self.start_chunk(computer)
+
+    def instruction(self, computer: IntcodeComputer, ip: int, op_code: int, addr: int | None, old: int | None,
+                    output: int | None) -> None:
+        """Hook called after every instruction: append its record to the current chunk"""
+        records = self.records
+        self.count += 1
+        put_varint(records, ip - self.next_ip)
+        records.append(op_code)
+        if addr is not None:
+            put_varint(records, addr)
+            put_varint(records, computer.memory[addr])
+        elif op_code == 4:
+            put_varint(records, output)
+        self.next_ip = ip + OPERAND_COUNT[op_code] + 1
+        if self.count - self.chunk_start >= self.checkpoint_interval: self.start_chunk(computer)
+
+    def stop(self, computer: IntcodeComputer, waiting: bool) -> None:
+        """Hook called when a computer stops executing"""
+
+class TraceReplayer:
+    """Reads a trace written by TraceRecorder. Any instruction count can be reached by restoring the nearest checkpoint
+    before it, and rolling forward by executing the recorded instructions with the recorded input"""
+    def __init__(self, path: str) -> None:
+        with open(path, 'rb') as file:
+            self.data = file.read()
+        if not self.data.startswith(MAGIC): raise ValueError(f'{path} is not an Intcode trace')
+
+        # Index the chunks as (first instruction count, checkpoint position, instruction count, records position)
+        self.chunks = []
+        pos = len(MAGIC)
+        while pos < len(self.data):
+            (start, state_len, count, records_len), pos = get_varints(self.data, pos, 4)
+            self.chunks.append((start, pos, count, pos + state_len))
+            pos += state_len + records_len
+        self.length = self.chunks[-1][0] + self.chunks[-1][2] if self.chunks else 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    def events(self, start: int = 0) -> Generator[tuple, None, None]:
+        """Generate the recorded instructions from instruction count 'start' on, as tuples of (instruction count,
+        address, op code, (written address, written value) or None, output value or None)"""
+        for first, _, count, pos in self.chunks:
+            if first + count <= start: continue
+            next_ip = 0
+            for n in range(first, first + count):
+                delta, pos = get_varint(self.data, pos)
+                ip = next_ip + delta
+                op_code = self.data[pos]
+                pos += 1
+                write = output = None
+                if op_code in WRITE_OPERAND:
+                    write, pos = get_varints(self.data, pos, 2)
+                    write = tuple(write)
+                elif op_code == 4:
+                    output, pos = get_varint(self.data, pos)
+                next_ip = ip + OPERAND_COUNT[op_code] + 1
+                if n >= start: yield n, ip, op_code, write, output
+
+    def seek(self, count: int) -> IntcodeComputer:
+        """A computer in the state right after the first 'count' instructions of the trace"""
+        if not 0 <= count <= self.length: raise IndexError(f'Instruction count {count} is outside of the trace')
+        first, state_pos, _, _ = [ chunk for chunk in self.chunks if chunk[0] <= count ][-1]
+        computer = IntcodeComputer([])
+        decode_state(self.data, state_pos, computer)
+
+        inputs = []
+        for n, ip, op_code, write, output in self.events(first):
+            if n >= count: break
+            if ip != computer.instr_ptr:
+                raise ValueError(f'Replay diverges at instruction {n}: trace at {ip}, computer at {computer.instr_ptr}')
+            if op_code == 3: inputs.append(write[1])
+            computer.step(inputs.pop, lambda val: None)
+        return computer
@@ -0,0 +1,119 @@
+from array import array
+from collections import deque
+from multiprocessing import BufferTooShort
+from multiprocessing.connection import Connection as PipeConnection
+from .computer import IntcodeComputer, ExecutionMode
+
+#
+# Constants
+#
+WAITING = 0             # Status of a computer that stopped to wait for input
+HALTED = 1              # Status of a computer that ran to completion
+FRAME_TYPE = 'q'        # Frames are arrays of signed 64 bit values
+
+#
+# Classes
+#
+class Channel:
+    """Framed binary protocol on top of one end of a Pipe. Each frame is a batch of integers sent as one raw array of
+    64 bit values, which is received into a reusable buffer instead of being pickled and unpickled value by value"""
+    def __init__(self, conn: PipeConnection) -> None:
+        self.conn = conn
+        self.buffer = array(FRAME_TYPE, bytes(8 * 256))
+
+    def send(self, values) -> None:
+        """Send a batch of integers as one frame"""
+        self.conn.send_bytes(array(FRAME_TYPE, values))
+
+    def recv(self) -> array:
+        """Receive one frame, growing the receive buffer if the frame does not fit in it"""
+        try:
+            size = self.conn.recv_bytes_into(self.buffer)
+        except BufferTooShort as e:
+            frame = e.args[0]
+            self.buffer = array(FRAME_TYPE, bytes(max(len(frame), 2 * len(self.buffer) * self.buffer.itemsize)))
+            return array(FRAME_TYPE, frame)
+        return self.buffer[:size // self.buffer.itemsize]
+
+    def poll(self, timeout: float | None = 0) -> bool:
+        """Whether there is a frame to receive, waiting up to 'timeout' seconds (forever if None)"""
+        return self.conn.poll(timeout)
+
+    def close(self) -> None:
+        self.conn.close()
+
+class RemoteConnection:
+    """Host end of a Channel to an Intcode computer running in another process (see serve), with the same interface as
+    Connection. Queued input is sent as one frame, so a whole line of ASCII input costs a single message. The computer
+    sends back all its output as one frame whenever it waits for input or halts. Closing it sends an empty frame, which
+    tells serve to stop: under fork, other child processes may hold copies of this end of the Pipe, so closing it
+    alone would never show up as EOF in the worker"""
+    def __init__(self, conn: PipeConnection) -> None:
+        self.channel = Channel(conn)
+        self.inputs = []
+        self.outputs = deque()
+        self.busy = True        # The computer boots right away, and answers with its first frame
+        self.completed = False
+
+    def send(self, val: int) -> None:
+        """Queue a value as input for the computer"""
+        self.inputs.append(val)
+
+    def sendline(self, string: str) -> None:
+        """Queue a line of ASCII input for the computer"""
+        self.inputs.extend(map(ord, string + '\n'))
+
+    def poll(self, timeout: float | None = 0) -> bool:
+        """Send any queued input, and return whether there is output to receive, waiting up to 'timeout' seconds"""
+        if not self.busy and self.inputs and not self.completed:
+            self.channel.send(self.inputs)
+            self.inputs = []
+            self.busy = True
+        if self.busy and not self.outputs and self.channel.poll(timeout):
+            status, *outputs = self.channel.recv()
+            self.outputs.extend(outputs)
+            self.completed = status == HALTED
+            self.busy = False
+        return len(self.outputs) > 0
+
+    def recv(self) -> int:
+        """Receive the next output of the computer, waiting for it if the computer is still running"""
+        while not self.poll(None if self.busy or self.inputs else 0):
+            if self.completed: raise EOFError('The Intcode program has halted')
+            # An empty frame may arrive while input is still queued, which the next poll sends
+            if not self.busy and not self.inputs: raise BlockingIOError('The Intcode program is waiting for input')
+        return self.outputs.popleft()
+
+    def readline(self) -> str:
+        """Receive a line of ASCII output from the computer"""
+        line = ''
+        while line[-1:] != '\n':
+            line += chr(self.recv())
+        return line[:-1]
+
+    def close(self) -> None:
+        """Ask the worker to stop, and close this end of the Pipe"""
+        if not self.completed:
+            try: self.channel.send([])
+            except OSError: pass    # The worker is gone already
+        self.channel.close()
+
+#
+# Worker processes
+#
+def serve(conn: PipeConnection, program: str | list, mode: int = ExecutionMode.INTERPRETED) -> None:
+    """Main function for a process running a computer on behalf of a RemoteConnection. Every frame sent back is the
+    computer's status (WAITING or HALTED) followed by all the output it produced since the previous frame. Input
+    frames are never empty, so an empty frame (or EOF) from the host ends the process"""
+    channel = Channel(conn)
+    computer = IntcodeComputer(program, mode)
+    outputs = computer.run()
+    while True:
+        try: channel.send([HALTED if computer.has_completed() else WAITING] + outputs)
+        except OSError: break   # Host closed its end of the Pipe while the computer was running
+        if computer.has_completed(): break
+        try: inputs = channel.recv()
+        except EOFError: break  # Host closed its end of the Pipe
+        if len(inputs) == 0: break
+        outputs = computer.run(inputs)
+    channel.close()
@@ -0,0 +1 @@
+from .renderer import Renderer
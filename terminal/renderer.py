@@ -0,0 +1,86 @@
+import sys, time
+
+#
+# Classes
+#
+class Renderer:
+    """Draws a grid of cells on an ANSI terminal. The renderer keeps a buffer of the cells and their bounds, which are
+    updated as cells are set, and a frame only moves the cursor to the cells that changed since the previous frame.
+    The whole screen is only redrawn when the bounds have grown. Frames are limited to 'fps', so a simulation can set
+    cells and ask for a frame on every step without being slowed down by the terminal.
+
+    Cells are addressed by complex positions x+y*1j, and hold text that takes 'cell_width' columns on screen. With
+    'flip_y', y grows upwards"""
+    def __init__(self, fps: float = 30, cell_width: int = 1, flip_y: bool = False, file=sys.stdout) -> None:
+        self.interval = 1 / fps if fps > 0 else 0
+        self.cell_width = cell_width
+        self.flip_y = flip_y
+        self.file = file
+        self.cells = {}
+        self.changed = set()
+        self.bounds = None          # (min x, min y, max x, max y) of all cells
+        self.drawn_bounds = None    # Bounds of the frame on screen
+        self.status_line = ''
+        self.drawn_status = None
+        self.last_frame = 0.0
+        self.frames = 0
+
+    def __getitem__(self, pos: complex) -> str:
+        return self.cells.get(pos, ' ' * self.cell_width)
+
+    def __setitem__(self, pos: complex, text: str) -> None:
+        if self.cells.get(pos) == text: return
+        self.cells[pos] = text
+        self.changed.add(pos)
+        x, y = int(pos.real), int(pos.imag)
+        if self.bounds is None: self.bounds = (x, y, x, y)
+        elif not (self.bounds[0] <= x <= self.bounds[2] and self.bounds[1] <= y <= self.bounds[3]):
+            min_x, min_y, max_x, max_y = self.bounds
+            self.bounds = (min(min_x, x), min(min_y, y), max(max_x, x), max(max_y, y))
+
+    def status(self, text: str) -> None:
+        """Set the line of text shown below the grid"""
+        self.status_line = text
+
+    def height(self) -> int:
+        return 0 if self.bounds is None else self.bounds[3] - self.bounds[1] + 1
+
+    def text(self) -> str:
+        """The whole grid as lines of text, e.g. to print it once instead of animating it"""
+        if self.bounds is None: return ''
+        min_x, min_y, max_x, max_y = self.bounds
+        rows = range(max_y, min_y - 1, -1) if self.flip_y else range(min_y, max_y + 1)
+        return '\n'.join(''.join(self[x+y*1j] for x in range(min_x, max_x + 1)) for y in rows)
+
+    def frame(self, force: bool = False) -> bool:
+        """Bring the screen up to date with the buffer, unless the previous frame was less than a frame interval ago
+        and 'force' is False. Returns whether a frame was drawn"""
+        now = time.perf_counter()
+        if not force and now - self.last_frame < self.interval: return False
+        self.last_frame = now
+        if self.bounds is None: return False
+
+        min_x, min_y, _, max_y = self.bounds
+        if self.bounds != self.drawn_bounds:
+            out = ['\033[?25l\033[2J\033[H', self.text()]
+            self.drawn_bounds = self.bounds
+            self.drawn_status = None
+        else:
+            out = []
+            for pos in self.changed:
+                row = max_y - int(pos.imag) if self.flip_y else int(pos.imag) - min_y
+                out.append(f'\033[{row + 1};{(int(pos.real) - min_x) * self.cell_width + 1}H{self.cells[pos]}')
+        self.changed.clear()
+        if self.status_line != self.drawn_status:
+            out.append(f'\033[{self.height() + 1};1H\033[K{self.status_line}')
+            self.drawn_status = self.status_line
+        self.file.write(''.join(out))
+        self.file.flush()
+        self.frames += 1
+        return True
+
+    def close(self) -> None:
+        """Draw the final frame, and leave the cursor below it"""
+        self.frame(force=True)
+        self.file.write(f'\033[{self.height() + 2};1H\033[?25h')
+        self.file.flush()